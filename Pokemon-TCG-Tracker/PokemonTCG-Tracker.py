@@ -6,12 +6,19 @@ Pokemon TCG Scanner
 import argparse                 # helps easily write user-friendly command-line interfaces
 import ast                      # helps process trees of the python abstract syntax grammer
 import collections              # provides alternatives to dict, list, set, and tuple
+import contextlib               # helps write the profiler stage context manager
+from concurrent.futures import ProcessPoolExecutor, as_completed  # runs work on a pool of processes
+import csv                      # writes the batch scan results
 import cv2                      # assists with image processing and object detection
 import imagehash as ih          # image comparison tool
+import json                     # writes the batch scan results
 import numpy as np              # tool for data analysis. working with arrays and matrices
 from operator import itemgetter # allows you to retrieve specific items from an iterable easily
 import os                       # provides functions for interacting with the OS. File manipulation an shell commands
 import pandas as pd             # analyze data
+import queue                    # thread-safe queues between the pipeline stages
+import sqlite3                  # on-disk database for the card information cache
+import threading                # locks so the caches can be shared between threads
 from PIL import Image           # load images from files and create new images
 from pokemontcgsdk import Card  # PokemonTCG database
 from pokemontcgsdk import Set
@@ -27,6 +34,60 @@ import time                     # returns the CPU time of the current process
 
 recent = ""
 
+IMAGE_EXTENSIONS = ('.png', '.jpg', '.jpeg')
+VIDEO_EXTENSIONS = ('.mp4', '.avi', '.mov', '.mkv', '.webm')
+CARD_POOL = "Pokemon-TCG-Tracker/Card-Images"
+HASH_INDEX_PATH = "Pokemon-TCG-Tracker/card_hashes.npz"
+HASH_BACKEND = "cascade"        # nearest-hash search backend, see HASH_BACKENDS
+MAX_HASH_DIST = 48              # cards further away than this (out of 256 bits) are treated as unknown
+CARD_CACHE_PATH = "Pokemon-TCG-Tracker/card_cache.sqlite3"
+STATIC_TTL = 30 * 24 * 3600     # seconds name, set and rarity of a cached card stay valid
+PRICE_TTL = 6 * 3600            # seconds the price of a cached card stays valid
+PIPELINED = True                # run capture, detection and lookups on their own threads
+API_BASE_URL = "https://api.pokemontcgio/v2/cards"
+DETECT_SCALE = 0.5              # the contour search runs on the frame downscaled by this factor
+PROFILE_REPORT_PATH = "Pokemon-TCG-Tracker/profile_report.json"
+
+def hash_card_image(img, hash_size=16):
+    """
+    Calculate the perceptual hash (pHash) of a single card image
+    [img] BGR card image
+    [hash_size] param for pHash algorithm
+    [return] flattened boolean array of hash bits
+    """
+    # preprocessing steps like resizing and grayscaling
+    img = cv2.resize(img, (600, 400))
+    img_gray = cv2.cvtColor(img, cv2.COLOR_BGR2GRAY)
+    thresh_val = 150 # adjust based on image quality
+    _, img_thresh = cv2.threshold(img_gray, thresh_val, 255, cv2.THRESH_BINARY)
+
+    # get image hash
+    hash_val = ih.phash(Image.fromarray(img_thresh), hash_size=hash_size)
+    return hash_val.hash.flatten()
+
+# compact signatures of a card: packed pHash bits, packed 8x8 dHash bits and a 4x4x4 BGR color histogram
+CardSignature = collections.namedtuple("CardSignature", ["phash", "dhash", "hist"])
+DHASH_SIZE = 8
+HIST_BINS = 4
+
+def card_signature(img, hash_size=16):
+    """
+    Calculate all the signatures of a single card image
+    [img] BGR card image
+    [hash_size] param for pHash algorithm
+    [return] CardSignature with the pHash and dHash as packed bits (uint8) and the
+             color histogram scaled to 0-255 (uint8)
+    """
+    phash = np.packbits(hash_card_image(img, hash_size))
+
+    small = cv2.resize(img, (64, 64), interpolation=cv2.INTER_AREA)
+    small_gray = cv2.cvtColor(small, cv2.COLOR_BGR2GRAY)
+    dhash = np.packbits(ih.dhash(Image.fromarray(small_gray), hash_size=DHASH_SIZE).hash.flatten())
+
+    hist = cv2.calcHist([small], [0, 1, 2], None, [HIST_BINS] * 3, [0, 256] * 3).flatten()
+    hist = np.rint(hist * (255.0 / max(hist.max(), 1))).astype(np.uint8)
+    return CardSignature(phash, dhash, hist)
+
 def calc_image_hashes(card_pool, hash_size=16):
     """
     Compare card on video with each card in the database and gives them a value
@@ -39,25 +100,621 @@ def calc_image_hashes(card_pool, hash_size=16):
     card_hashes = {}
 
     for filename in os.listdir(card_pool):
-        if filename.endswith(('.png', '.jpg', '.jpeg')):
+        if filename.endswith(IMAGE_EXTENSIONS):
             card_name = filename.split('.')[0]  # Extract the card name (e.g. "xy1-1")
             img_path = os.path.join(card_pool, filename)
 
-            # load and preprocess image
+            # load image and get its hash, unreadable images are skipped
             img = cv2.imread(img_path)
+            if img is None:
+                print(f"Skipping unreadable image {img_path}")
+                continue
+            card_hashes[card_name] = hash_card_image(img, hash_size)
+    
+    return card_hashes
 
-            # preprocessing steps like resizing and grayscaling
-            img = cv2.resize(img, (600, 400))
-            img_gray = cv2.cvtColor(img, cv2.COLOR_BGR2GRAY)
-            thresh_val = 150 # adjust based on image quality
-            _, img_thresh = cv2.threshold(img_gray, thresh_val, 255, cv2.THRESH_BINARY)
+def _hash_card_file(task):
+    """
+    hash one image file of the card pool, runs inside the build worker processes
+    [task] (card_pool, filename, hash_size)
+    [return] (filename, CardSignature or None, error message or None)
+    """
+    card_pool, filename, hash_size = task
+    img_path = os.path.join(card_pool, filename)
+    try:
+        img = cv2.imread(img_path)
+        if img is None:
+            return filename, None, "unreadable or corrupt image"
+        return filename, card_signature(img, hash_size), None
+    except Exception as e:          # a bad file must not abort the whole build
+        return filename, None, str(e)
 
-            # get image hash
-            hash_val = ih.phash(Image.fromarray(img_thresh), hash_size=hash_size)
 
-            card_hashes[card_name] = hash_val.hash.flatten()
-    
-    return card_hashes
+class CardHashIndex:
+    """
+    Persistent signature index of a card pool.
+    The pHash is stored as packed bits (hash_size * hash_size / 8 bytes per card),
+    next to a packed 8x8 dHash and a 64 bin color histogram (see card_signature),
+    together with the filename and mtime of the image they came from, so the pool
+    only has to be hashed once and later runs just pick up new or changed images.
+    """
+    VERSION = 2                 # bumped when the stored signatures change, older files are rebuilt
+
+    def __init__(self, hash_size=16):
+        self.hash_size = hash_size
+        self.filenames = []         # image filenames, e.g. "xy1-1.png"
+        self.mtimes = np.zeros(0, dtype=np.float64)
+        self.packed = np.zeros((0, hash_size * hash_size // 8), dtype=np.uint8)
+        self.dhash = np.zeros((0, DHASH_SIZE * DHASH_SIZE // 8), dtype=np.uint8)
+        self.hist = np.zeros((0, HIST_BINS ** 3), dtype=np.uint8)
+
+    def __len__(self):
+        return len(self.filenames)
+
+    @property
+    def names(self):
+        # card names are the filenames without extension (e.g. "xy1-1")
+        return [filename.split('.')[0] for filename in self.filenames]
+
+    @classmethod
+    def load(cls, path, hash_size=16):
+        """
+        Load an index from disk
+        [path] path of the .npz index file
+        [hash_size] expected pHash hash size, an index built with another size is discarded
+        [return] loaded index, or an empty one if the file is missing or stale
+        """
+        index = cls(hash_size)
+        if not os.path.exists(path):
+            return index
+        try:
+            with np.load(path, allow_pickle=False) as data:
+                if int(data["hash_size"]) != hash_size or "version" not in data or int(data["version"]) != cls.VERSION:
+                    return index
+                index.filenames = [str(name) for name in data["filenames"]]
+                index.mtimes = data["mtimes"].astype(np.float64)
+                index.packed = data["packed"].astype(np.uint8)
+                index.dhash = data["dhash"].astype(np.uint8)
+                index.hist = data["hist"].astype(np.uint8)
+        except (OSError, KeyError, ValueError) as e:
+            print(f"Could not read hash index {path}, rebuilding: {e}")
+            return cls(hash_size)
+        return index
+
+    def save(self, path):
+        """
+        Write the index to disk. The file is written next to the target first
+        and then moved over it, so an interrupted save never corrupts the index
+        [path] path of the .npz index file
+        """
+        tmp_path = path + ".tmp.npz"
+        np.savez(tmp_path,
+                 version=np.int32(self.VERSION),
+                 hash_size=np.int32(self.hash_size),
+                 filenames=np.array(self.filenames, dtype=str),
+                 mtimes=self.mtimes,
+                 packed=self.packed,
+                 dhash=self.dhash,
+                 hist=self.hist)
+        os.replace(tmp_path, path)
+
+    def update(self, card_pool, workers=1, progress_every=500):
+        """
+        Bring the index in line with the card pool folder.
+        Only images that are new or whose mtime changed are hashed again,
+        entries of images that were removed are dropped.
+        Images that can't be read are reported and left out of the index,
+        an indexed image that changed and can't be read anymore counts as removed
+        [card_pool] folder containing all card images
+        [workers] number of processes to hash with, None for one per CPU
+        [progress_every] print progress and throughput every this many images, 0 to disable
+        [return] (number of hashed images, number of removed entries)
+        """
+        known = {filename: i for i, filename in enumerate(self.filenames)}
+        filenames = sorted(f for f in os.listdir(card_pool) if f.endswith(IMAGE_EXTENSIONS))
+
+        keep = []
+        to_hash = []
+        for filename in filenames:
+            mtime = os.path.getmtime(os.path.join(card_pool, filename))
+            i = known.get(filename)
+            if i is not None and self.mtimes[i] == mtime:
+                keep.append(i)
+            else:
+                to_hash.append((filename, mtime))
+        removed = len(self.filenames) - len(keep) - sum(1 for f, _ in to_hash if f in known)
+
+        new_filenames = [self.filenames[i] for i in keep]
+        new_mtimes = [self.mtimes[i] for i in keep]
+        new_packed = [self.packed[keep]]
+        new_dhash = [self.dhash[keep]]
+        new_hist = [self.hist[keep]]
+        mtimes = dict(to_hash)
+        hashed = 0
+        failed = 0
+        start = time.perf_counter()
+        for filename, sig, error in self._hash_files(card_pool, [f for f, _ in to_hash], workers):
+            if error is not None:
+                failed += 1
+                if filename in known:
+                    removed += 1     # its old signature is stale, drop it from the saved index too
+                print(f"Skipping {filename}: {error}")
+            else:
+                new_filenames.append(filename)
+                new_mtimes.append(mtimes[filename])
+                new_packed.append(sig.phash[np.newaxis, :])
+                new_dhash.append(sig.dhash[np.newaxis, :])
+                new_hist.append(sig.hist[np.newaxis, :])
+            hashed += 1
+            if progress_every and (hashed % progress_every == 0 or hashed == len(to_hash)):
+                rate = hashed / max(time.perf_counter() - start, 1e-9)
+                print(f"Hashed {hashed}/{len(to_hash)} images ({rate:.1f} images/sec, {failed} failed)")
+
+        self.filenames = new_filenames
+        self.mtimes = np.array(new_mtimes, dtype=np.float64)
+        self.packed = np.concatenate(new_packed, axis=0)
+        self.dhash = np.concatenate(new_dhash, axis=0)
+        self.hist = np.concatenate(new_hist, axis=0)
+        return hashed - failed, removed
+
+    def _hash_files(self, card_pool, filenames, workers):
+        """
+        hash image files either in this process or on a process pool
+        [return] iterator of (filename, CardSignature or None, error message or None)
+        """
+        tasks = [(card_pool, filename, self.hash_size) for filename in filenames]
+        if workers == 1 or len(tasks) < 2:
+            yield from map(_hash_card_file, tasks)
+            return
+        n_workers = workers or os.cpu_count() or 1
+        with ProcessPoolExecutor(max_workers=n_workers) as pool:
+            # big enough chunks to keep the inter-process overhead low, small enough to report progress
+            chunksize = max(1, min(64, len(tasks) // (n_workers * 4)))
+            yield from pool.map(_hash_card_file, tasks, chunksize=chunksize)
+
+    def as_dict(self):
+        """
+        [return] dictionary of card hashes in the same format as calc_image_hashes
+        """
+        n_bits = self.hash_size * self.hash_size
+        bits = np.unpackbits(self.packed, axis=1, count=n_bits).astype(bool)
+        return dict(zip(self.names, bits))
+
+
+def load_hash_index(card_pool, index_path, hash_size=16, workers=None):
+    """
+    Load the hash index from disk, bring it up to date with the card pool and
+    save it again if anything changed
+    [card_pool] folder containing all card images
+    [index_path] path of the .npz index file
+    [hash_size] param for pHash algorithm
+    [workers] number of processes used to hash new images, None for one per CPU
+    [return] up to date CardHashIndex
+    """
+    index = CardHashIndex.load(index_path, hash_size)
+    hashed, removed = index.update(card_pool, workers=workers)
+    if hashed or removed:
+        print(f"Hash index updated: {hashed} hashed, {removed} removed, {len(index)} cards total")
+        index.save(index_path)
+    return index
+
+
+def _packed_phash(query):
+    """
+    [query] CardSignature, or a flattened boolean pHash as returned by hash_card_image
+    [return] packed pHash bits
+    """
+    if isinstance(query, CardSignature):
+        return query.phash
+    return np.packbits(np.asarray(query, dtype=bool))
+
+# number of set bits for every possible byte, used when numpy has no bitwise_count
+_POPCOUNT_TABLE = np.array([bin(i).count("1") for i in range(256)], dtype=np.uint8)
+
+def popcount_rows(words):
+    """
+    count the set bits of each row of a 2D unsigned integer matrix
+    [words] (N, W) matrix of uint8 or uint64 words
+    [return] (N,) array of bit counts
+    """
+    if hasattr(np, "bitwise_count"):
+        return np.bitwise_count(words).sum(axis=1, dtype=np.int32)
+    return _POPCOUNT_TABLE[words.view(np.uint8)].sum(axis=1, dtype=np.int32)
+
+class HashMatcher:
+    """
+    Brute-force Hamming distance matcher over the whole card pool.
+    All database hashes are kept as one packed (N, W) uint64 matrix, so a query
+    is a single XOR + popcount over the matrix instead of a Python loop
+    """
+    def __init__(self, names, packed):
+        """
+        [names] list of card names, one per row of packed
+        [packed] (N, B) uint8 matrix of np.packbits-ed hashes
+        """
+        self.names = list(names)
+        packed = np.ascontiguousarray(packed, dtype=np.uint8)
+        # pad each row to a multiple of 8 bytes so it can be viewed as uint64 words
+        pad = (-packed.shape[1]) % 8
+        if pad:
+            packed = np.pad(packed, ((0, 0), (0, pad)))
+        self.n_bytes = packed.shape[1]
+        self.words = packed.view(np.uint64)
+
+    def __len__(self):
+        return len(self.names)
+
+    @classmethod
+    def from_index(cls, index):
+        return cls(index.names, index.packed)
+
+    @classmethod
+    def from_dict(cls, card_hashes):
+        """
+        [card_hashes] dictionary of card hashes as returned by calc_image_hashes
+        """
+        names = list(card_hashes.keys())
+        packed = np.array([np.packbits(bits) for bits in card_hashes.values()], dtype=np.uint8)
+        return cls(names, packed.reshape(len(names), -1))
+
+    def _query_words(self, packed):
+        # pad the query like the pool rows
+        query = np.zeros(self.n_bytes, dtype=np.uint8)
+        query[:len(packed)] = packed
+        return query.view(np.uint64)
+
+    def distances(self, hash_bits):
+        """
+        [hash_bits] CardSignature or flattened boolean pHash of the query card
+        [return] (N,) array of Hamming distances to every card in the pool
+        """
+        return self.packed_distances(_packed_phash(hash_bits))
+
+    def packed_distances(self, packed, rows=None):
+        """
+        [packed] np.packbits-ed query hash, of the same kind as the pool (e.g. CardSignature.dhash)
+        [rows] indices of the cards to compare with, None for the whole pool
+        [return] array of Hamming distances to the cards in rows
+        """
+        words = self.words if rows is None else self.words[rows]
+        return popcount_rows(np.bitwise_xor(words, self._query_words(packed)))
+
+    def match(self, hash_bits, k=1):
+        """
+        find the k closest cards in the pool
+        [hash_bits] CardSignature or flattened boolean pHash of the query card
+        [k] number of matches to return
+        [return] list of (card name, Hamming distance) sorted by distance
+        """
+        if len(self.names) == 0:
+            return []
+        dists = self.distances(hash_bits)
+        k = min(k, len(dists))
+        top = np.argpartition(dists, k - 1)[:k]
+        top = top[np.argsort(dists[top], kind="stable")]
+        return [(self.names[i], int(dists[i])) for i in top]
+
+    def query(self, hash_bits, max_dist=None, k=1):
+        """
+        find the k closest cards that are at most max_dist away
+        [hash_bits] CardSignature or flattened boolean pHash of the query card
+        [max_dist] maximum Hamming distance of a match, None for no limit
+        [k] number of matches to return
+        [return] list of (card name, Hamming distance) sorted by distance
+        """
+        matches = self.match(hash_bits, k)
+        if max_dist is not None:
+            matches = [m for m in matches if m[1] <= max_dist]
+        return matches
+
+
+def _packed_to_ints(packed):
+    # one Python int per hash, so the distance is just (a ^ b).bit_count()
+    return [int.from_bytes(row.tobytes(), "big") for row in np.asarray(packed, dtype=np.uint8)]
+
+def _bits_to_int(hash_bits):
+    return int.from_bytes(_packed_phash(hash_bits).tobytes(), "big")
+
+class MultiIndexHash:
+    """
+    Multi-index hashing over the card hashes.
+    Each hash is cut into n_chunks substrings that are looked up in their own table.
+    If two hashes are at distance d, at least one of their substrings differs in at
+    most d // n_chunks bits, so probing every substring at radius 0 finds every card
+    within n_chunks - 1 of the query and radius 1 every card within 2 * n_chunks - 1.
+    The chunks are sized so that radius 1 covers max_dist, a query never probes further:
+    a known card is usually settled by the radius 0 probe, an unknown one after radius 1.
+    The probes only pay off while few cards share a substring, i.e. for small max_dist
+    and large pools; at MAX_HASH_DIST = 48 the chunks are only 10 bits
+    """
+    def __init__(self, names, packed, max_dist=None):
+        """
+        [names] list of card names, one per row of packed
+        [packed] (N, B) uint8 matrix of np.packbits-ed hashes
+        [max_dist] largest query radius the tables are built for, MAX_HASH_DIST if None.
+                   Queries with a larger radius fall back to the brute-force scan
+        """
+        self.names = list(names)
+        packed = np.asarray(packed, dtype=np.uint8)
+        self.brute = HashMatcher(self.names, packed)
+        self.n_bits = packed.shape[1] * 8
+        self.max_dist = MAX_HASH_DIST if max_dist is None else max_dist
+        # fewest chunks whose radius 1 probe covers max_dist (2 * n_chunks - 1 >= max_dist)
+        self.chunk_bits = max(1, self.n_bits // max(1, (self.max_dist + 2) // 2))
+        self.n_chunks = -(-self.n_bits // self.chunk_bits)
+        self.widths = [min(self.chunk_bits, self.n_bits - j * self.chunk_bits) for j in range(self.n_chunks)]
+        groups = [collections.defaultdict(list) for _ in range(self.n_chunks)]
+        for i, value in enumerate(_packed_to_ints(packed)):
+            for j, chunk in enumerate(self._chunks(value)):
+                groups[j][chunk].append(i)
+        # chunk value -> ids of the cards with that substring
+        self.tables = [{chunk: np.array(ids, dtype=np.int64) for chunk, ids in group.items()} for group in groups]
+
+    def __len__(self):
+        return len(self.names)
+
+    @classmethod
+    def from_index(cls, index, max_dist=None):
+        return cls(index.names, index.packed, max_dist)
+
+    def _chunks(self, value):
+        mask = (1 << self.chunk_bits) - 1
+        return [(value >> (j * self.chunk_bits)) & mask for j in range(self.n_chunks)]
+
+    def covered(self, radius):
+        """
+        [return] Hamming distance up to which probing at radius finds every card
+        """
+        return (radius + 1) * self.n_chunks - 1
+
+    def _probe(self, chunks, radius):
+        # ids of the cards with a substring exactly radius bits away from the query's (0 or 1)
+        found = []
+        for j, chunk in enumerate(chunks):
+            table = self.tables[j]
+            flips = [0] if radius == 0 else [1 << b for b in range(self.widths[j])]
+            for flip in flips:
+                ids = table.get(chunk ^ flip)
+                if ids is not None:
+                    found.append(ids)
+        return found
+
+    def query(self, hash_bits, max_dist=None, k=1):
+        """
+        find the k closest cards that are at most max_dist away.
+        The substrings are probed at radius 0, and at radius 1 only if the k-th best
+        match isn't known to be final yet
+        [hash_bits] CardSignature or flattened boolean pHash of the query card
+        [max_dist] maximum Hamming distance of a match, None for no limit (brute force)
+        [k] number of matches to return
+        [return] list of (card name, Hamming distance) sorted by distance
+        """
+        if not self.names:
+            return []
+        if max_dist is None or max_dist > self.covered(1):
+            return self.brute.query(hash_bits, max_dist, k)
+        packed = _packed_phash(hash_bits)
+        chunks = self._chunks(_bits_to_int(hash_bits))
+        exact = self._probe(chunks, 0)
+        if exact:
+            best = self._verify(np.unique(np.concatenate(exact)), packed, max_dist, k)
+            if self.covered(0) >= max_dist or (len(best) == k and best[-1][1] <= self.covered(0)):
+                return best
+        found = exact + self._probe(chunks, 1)
+        if not found:
+            return []
+        # a card within max_dist has at most max_dist // 2 substrings that differ in 2+ bits,
+        # so it was hit by at least n_chunks - max_dist // 2 of the probes. This drops most
+        # of the cards that only share one substring by chance before they are verified
+        hits = np.bincount(np.concatenate(found), minlength=len(self.names))
+        return self._verify(np.flatnonzero(hits >= self.n_chunks - max_dist // 2), packed, max_dist, k)
+
+    def _verify(self, cand, packed, max_dist, k):
+        # Hamming distances of all candidates at once on the packed hashes
+        dists = self.brute.packed_distances(packed, cand)
+        within = dists <= max_dist
+        cand, dists = cand[within], dists[within]
+        order = np.argsort(dists, kind="stable")[:k]
+        return [(self.names[cand[j]], int(dists[j])) for j in order]
+
+class CascadeMatcher:
+    """
+    Matches on all three card signatures, cheapest first.
+    The 64 bit dHash (one uint64 per card) is scanned for the whole pool to get a
+    shortlist, only the shortlist is compared on the 256 bit pHash and the color
+    histogram, and the fused score of the three decides the ranking. That tells
+    reprints and alternate arts apart without scanning the pool on every signature
+    """
+    def __init__(self, names, packed, dhash, hist, shortlist=32, weights=(1.0, 0.5, 0.5)):
+        """
+        [names] list of card names
+        [packed] (N, B) uint8 matrix of packed pHashes
+        [dhash] (N, 8) uint8 matrix of packed dHashes
+        [hist] (N, 64) uint8 matrix of color histograms
+        [shortlist] number of cards the dHash pass keeps for re-ranking
+        [weights] weights of the pHash, dHash and histogram distances in the fused score
+        """
+        self.names = list(names)
+        self.phash = HashMatcher(names, packed)
+        self.dhash = HashMatcher(names, dhash)
+        self.hist = np.asarray(hist, dtype=np.int16)
+        self.shortlist = shortlist
+        self.weights = weights
+        self.phash_bits = np.asarray(packed).shape[1] * 8
+        self.dhash_bits = np.asarray(dhash).shape[1] * 8
+
+    def __len__(self):
+        return len(self.names)
+
+    @classmethod
+    def from_index(cls, index):
+        return cls(index.names, index.packed, index.dhash, index.hist)
+
+    def query(self, sig, max_dist=None, k=1):
+        """
+        find the k best cards by fused score whose pHash is at most max_dist away
+        [sig] CardSignature of the query card
+        [max_dist] maximum pHash Hamming distance of a match, None for no limit
+        [k] number of matches to return
+        [return] list of (card name, pHash Hamming distance) sorted by fused score
+        """
+        if not self.names:
+            return []
+        # cheap pass: dHash over the whole pool
+        d_dists = self.dhash.packed_distances(sig.dhash)
+        n = min(max(self.shortlist, k), len(d_dists))
+        cand = np.argpartition(d_dists, n - 1)[:n]
+
+        # expensive passes on the shortlist only
+        p_dists = self.phash.packed_distances(sig.phash, cand)
+        h_dists = np.abs(self.hist[cand] - sig.hist.astype(np.int16)).sum(axis=1)
+
+        w_p, w_d, w_h = self.weights
+        score = (w_p * p_dists / self.phash_bits
+                 + w_d * d_dists[cand] / self.dhash_bits
+                 + w_h * h_dists / (2 * 255 * HIST_BINS ** 3))
+        order = np.argsort(score, kind="stable")
+        matches = []
+        for j in order:
+            if max_dist is None or p_dists[j] <= max_dist:
+                matches.append((self.names[cand[j]], int(p_dists[j])))
+                if len(matches) == k:
+                    break
+        return matches
+
+HASH_BACKENDS = {
+    "brute": HashMatcher,
+    "mih": MultiIndexHash,
+    "cascade": CascadeMatcher,
+}
+
+def make_hash_backend(index, backend="brute"):
+    """
+    build a nearest-hash search backend for a card hash index
+    [index] CardHashIndex of the card pool
+    [backend] one of HASH_BACKENDS ("brute", "mih" or "cascade")
+    [return] backend with a query(signature, max_dist, k) method
+    """
+    if backend not in HASH_BACKENDS:
+        raise ValueError(f"Unknown hash backend {backend!r}, expected one of {', '.join(HASH_BACKENDS)}")
+    return HASH_BACKENDS[backend].from_index(index)
+
+
+class StageProfiler:
+    """
+    Records how long each stage of the scanner takes on every frame.
+    Stage times are summed per frame (a frame with three cards has one "hash"
+    sample covering all three), the last `window` frames are kept to compute
+    p50/p95/p99 and the frame rate. Stages that don't belong to a frame, like the
+    card lookups in the pipeline, are recorded one sample per call with record()
+    """
+    def __init__(self, window=1000):
+        self.window = window
+        self.samples = collections.defaultdict(lambda: collections.deque(maxlen=window))
+        self.frame_ends = collections.deque(maxlen=window)
+        self.frames = 0
+        self.lock = threading.Lock()
+        self.local = threading.local()      # stage totals of the frame being processed by this thread
+
+    def _current(self):
+        if not hasattr(self.local, "totals"):
+            self.local.totals = collections.defaultdict(float)
+        return self.local.totals
+
+    @contextlib.contextmanager
+    def stage(self, name):
+        start = time.perf_counter()
+        try:
+            yield
+        finally:
+            self._current()[name] += time.perf_counter() - start
+
+    def record(self, name, seconds):
+        with self.lock:
+            self.samples[name].append(seconds)
+
+    def frame_done(self):
+        """
+        close the frame processed by this thread, its stage totals become one sample each
+        """
+        totals = self._current()
+        with self.lock:
+            for name, seconds in totals.items():
+                self.samples[name].append(seconds)
+            self.samples["frame"].append(sum(totals.values()))
+            self.frame_ends.append(time.perf_counter())
+            self.frames += 1
+        totals.clear()
+
+    def discard_frame(self):
+        """
+        throw away the stage totals of a frame this thread could not finish
+        """
+        self._current().clear()
+
+    def report(self):
+        """
+        [return] dictionary with the frame count, fps and per stage count, mean, p50, p95 and p99 in ms
+        """
+        with self.lock:
+            samples = {name: np.array(values) * 1000 for name, values in self.samples.items() if values}
+            frame_ends = list(self.frame_ends)
+            frames = self.frames
+        fps = 0.0
+        if len(frame_ends) > 1:
+            fps = (len(frame_ends) - 1) / max(frame_ends[-1] - frame_ends[0], 1e-9)
+        stages = {}
+        for name, ms in samples.items():
+            p50, p95, p99 = np.percentile(ms, [50, 95, 99])
+            stages[name] = {"count": len(ms), "mean_ms": round(float(ms.mean()), 3), "p50_ms": round(float(p50), 3),
+                            "p95_ms": round(float(p95), 3), "p99_ms": round(float(p99), 3)}
+        return {"frames": frames, "fps": round(fps, 2), "stages": stages}
+
+    def save_json(self, path):
+        with open(path, "w") as f:
+            json.dump(self.report(), f, indent=2)
+
+    def draw_overlay(self, frame):
+        """
+        draw the fps and the p50/p95 of each stage in the top left corner of the frame
+        """
+        report = self.report()
+        lines = [f"fps {report['fps']:.1f}"]
+        lines += [f"{name:<10} p50 {st['p50_ms']:6.1f}  p95 {st['p95_ms']:6.1f} ms" for name, st in report["stages"].items()]
+        height = 18 * len(lines) + 10
+        roi = frame[:height, :330]
+        roi[:] = (roi * 0.4).astype(np.uint8)       # darken the background so the text is readable
+        for i, line in enumerate(lines):
+            cv2.putText(frame, line, (6, 18 * (i + 1)), cv2.FONT_HERSHEY_PLAIN, 1.0, (0, 255, 255), 1)
+
+class NullProfiler:
+    """
+    Profiler that records nothing, used when profiling is off
+    """
+    @contextlib.contextmanager
+    def stage(self, name):
+        yield
+
+    def record(self, name, seconds):
+        pass
+
+    def frame_done(self):
+        pass
+
+    def discard_frame(self):
+        pass
+
+NULL_PROFILER = NullProfiler()
+PROFILER = StageProfiler()              # used by detect_frame when debug=True
+
+def get_profiler(debug):
+    """
+    [debug] False/None for no profiling, True for the module profiler, or a StageProfiler
+    [return] profiler to use
+    """
+    if isinstance(debug, (StageProfiler, NullProfiler)):
+        return debug
+    return PROFILER if debug else NULL_PROFILER
 
 
 # www.pyimagesearch.com/2014/08/25/4-point-opencv-getperspective-transform-example/
@@ -132,58 +789,123 @@ def four_point_transform(image, pts):
     # return the warped image
     return warped
 
+class FrameBuffers:
+    """
+    Preallocated images that are reused from frame to frame.
+    OpenCV writes into them through its dst= outputs, so the preprocessing of a
+    frame doesn't allocate new arrays. Each buffer is a view on a flat backing
+    array that only grows, so cards of slightly different sizes share the same
+    memory. Each thread needs its own FrameBuffers
+    """
+    def __init__(self):
+        self.backing = {}
+        self.allocations = 0            # number of times a backing array had to be (re)allocated
+
+    def get(self, name, shape, dtype=np.uint8, fill=None):
+        """
+        [name] name of the buffer
+        [shape] required shape
+        [dtype] required dtype
+        [fill] value the buffer is filled with when it is allocated, it must never be written to
+        [return] C-contiguous buffer of the given shape, its content is whatever the last user left in it
+        """
+        size = int(np.prod(shape))
+        backing = self.backing.get(name)
+        if backing is None or backing.size < size or backing.dtype != dtype:
+            # leave some room so a slightly bigger card next frame doesn't allocate again
+            capacity = size + size // 4
+            backing = np.empty(capacity, dtype=dtype) if fill is None else np.full(capacity, fill, dtype=dtype)
+            self.backing[name] = backing
+            self.allocations += 1
+        return backing[:size].reshape(shape)
+
+    def kernel(self, kernel_size):
+        return self.get(f"kernel{kernel_size}", tuple(kernel_size), fill=1)
+
+GLARE_DISK = cv2.getStructuringElement(cv2.MORPH_ELLIPSE, (3,3))
+
 # http://www.amphident.de/en/blog/preprocessing-for-automatic-pattern-identification-in-wildlife-removing-glare.html
-def remove_glare(img):
+def remove_glare(img, buffers=None):
     """
     reduce the glaring in the image.
     Finds the area that has low saturation but high value,
     which is what a glare usually looks like
     [img] source image
+    [buffers] FrameBuffers to work in, the result is then a buffer that is overwritten by the next call
     [return] image with reduced glare
     """
+    if buffers is None:
+        buffers = FrameBuffers()
+    height, width = img.shape[:2]
+    mask_shape = (height, width)
 
-    img_hsv = cv2.cvtColor(img, cv2.COLOR_BGR2HSV)
-    _, s, v = cv2.split(img_hsv)
-    non_sat = (s < 32) * 255    # Find all pixels that are not saturated
+    img_hsv = cv2.cvtColor(img, cv2.COLOR_BGR2HSV, dst=buffers.get("glare_hsv", img.shape))
+    s = cv2.extractChannel(img_hsv, 1, dst=buffers.get("glare_s", mask_shape))
+    v = cv2.extractChannel(img_hsv, 2, dst=buffers.get("glare_v", mask_shape))
+    # Find all pixels that are not saturated (s < 32)
+    _, non_sat = cv2.threshold(s, 31, 255, cv2.THRESH_BINARY_INV, dst=buffers.get("glare_non_sat", mask_shape))
 
     # Slightly decrease the area of the non-saturated pixels by a erosion operation
-    disk = cv2.getStructuringElement(cv2.MORPH_ELLIPSE, (3,3))
-    non_sat = cv2.erode(non_sat.astype(np.uint8), disk)
+    non_sat = cv2.erode(non_sat, GLARE_DISK, dst=buffers.get("glare_non_sat_eroded", mask_shape))
 
     # set all brightness values, where the pixels are still saturated to 0
-    v[non_sat == 0] = 0
-    # filter out very bright pixels
-    glare = (v > 200) * 255
+    cv2.bitwise_and(v, non_sat, dst=v)
+    # filter out very bright pixels (v > 200)
+    _, glare = cv2.threshold(v, 200, 255, cv2.THRESH_BINARY, dst=buffers.get("glare_mask", mask_shape))
 
     # slightly increase the area of each pixel
-    glare = cv2.dilate(glare.astype(np.uint8), disk)
-    glare_reduced = np.ones((img.shape[0], img.shape[1], 3), dtype=np.uint8) * 200
-    glare = cv2.cvtColor(glare, cv2.COLOR_GRAY2BGR)
-    corrected = np.where(glare, glare_reduced, img)
+    glare = cv2.dilate(glare, GLARE_DISK, dst=buffers.get("glare_mask_dilated", mask_shape))
+    glare_reduced = buffers.get("glare_reduced", img.shape, fill=200)
+    corrected = buffers.get("glare_corrected", img.shape)
+    np.copyto(corrected, img)
+    cv2.copyTo(glare_reduced, glare, corrected)
 
     return corrected
 
-def find_card(img, thresh_c=5, kernel_size=(3,3), size_thresh=10000):
+def find_card(img, thresh_c=5, kernel_size=(3,3), size_thresh=10000, scale=1.0, profiler=NULL_PROFILER, buffers=None):
     """
     find contours of all cards in the image
     [img] source image
     [thresh_c] value of the constant C for adaptive thresholding
     [kernel_size] dimension of the kernel used for dilation and erosion
-    [size_thresh] threshold in pixels of the contour to be a candidate
+    [size_thresh] threshold in pixels (of the full size image) of the contour to be a candidate
+    [scale] the contour search runs on a copy of the image resized by this factor,
+            the corners are mapped back to the full size image so the warp keeps the full resolution
+    [profiler] StageProfiler recording the "preprocess" and "contours" stages
+    [buffers] FrameBuffers reused for the intermediate images, None to allocate new ones
     [return] list of contours of the cards in the image
     """
-    # pre-processing - grayscale, blurring, thresholding
-    img_gray = cv2.cvtColor(img, cv2.COLOR_BGR2GRAY)
-    img_blur = cv2.medianBlur(img_gray, 5)
-    img_thresh = cv2.adaptiveThreshold(img_blur, 255, cv2.ADAPTIVE_THRESH_MEAN_C, cv2.THRESH_BINARY_INV, 5, thresh_c)
+    if buffers is None:
+        buffers = FrameBuffers()
+    full_img = img
+    with profiler.stage("preprocess"):
+        if scale != 1.0:
+            # INTER_AREA only has a fast path for integer factors, otherwise it's slower than the full size search
+            inv = 1.0 / scale
+            interpolation = cv2.INTER_AREA if abs(inv - round(inv)) < 1e-6 else cv2.INTER_LINEAR
+            size = (int(round(img.shape[1] * scale)), int(round(img.shape[0] * scale)))
+            img = cv2.resize(img, size, dst=buffers.get("small", (size[1], size[0], img.shape[2])),
+                             interpolation=interpolation)
+            size_thresh = size_thresh * scale * scale
+        mask_shape = img.shape[:2]
+
+        # pre-processing - grayscale, blurring, thresholding
+        img_gray = cv2.cvtColor(img, cv2.COLOR_BGR2GRAY, dst=buffers.get("gray", mask_shape))
+        img_blur = cv2.medianBlur(img_gray, 5, dst=buffers.get("blur", mask_shape))
+        img_thresh = cv2.adaptiveThreshold(img_blur, 255, cv2.ADAPTIVE_THRESH_MEAN_C, cv2.THRESH_BINARY_INV, 5, thresh_c,
+                                           dst=buffers.get("thresh", mask_shape))
 
-    # dilute the image, then erode them to remove minor noises
-    kernel = np.ones(kernel_size, np.uint8)
-    img_dilate = cv2.dilate(img_thresh, kernel, iterations=1)
-    img_erode = cv2.erode(img_dilate, kernel, iterations=1)
+        # dilute the image, then erode them to remove minor noises
+        kernel = buffers.kernel(kernel_size)
+        img_dilate = cv2.dilate(img_thresh, kernel, dst=buffers.get("dilate", mask_shape), iterations=1)
+        img_erode = cv2.erode(img_dilate, kernel, dst=buffers.get("erode", mask_shape), iterations=1)
 
+    with profiler.stage("contours"):
+        return _find_card_contours(img_erode, size_thresh, full_img.shape, scale)
+
+def _find_card_contours(img_erode, size_thresh, full_shape, scale):
     # find the contour
-    _, cnts, hier = cv2.findContours(img_erode, cv2.RETR_TREE, cv2.CHAIN_APPROX_SIMPLE)
+    cnts, hier = cv2.findContours(img_erode, cv2.RETR_TREE, cv2.CHAIN_APPROX_SIMPLE)
     if len(cnts) == 0:
         return []
     
@@ -200,7 +922,7 @@ def find_card(img, thresh_c=5, kernel_size=(3,3), size_thresh=10000):
         if i_next != -1:
             stack.append((i_next, hier[0][i_next]))
         
-        cnt = cnt[i_cnt]
+        cnt = cnts[i_cnt]
         size = cv2.contourArea(cnt)
         peri = cv2.arcLength(cnt, True)
         approx = cv2.approxPolyDP(cnt, 0.04 * peri, True)
@@ -210,103 +932,354 @@ def find_card(img, thresh_c=5, kernel_size=(3,3), size_thresh=10000):
         else:
             if i_child != -1:
                 stack.append((i_child, hier[0][i_child]))
-        
+
+    if scale != 1.0:
+        # map the corners back to the full size image
+        h, w = full_shape[:2]
+        cnts_rect = [np.clip(np.rint(approx / scale), 0, [w - 1, h - 1]).astype(np.int32) for approx in cnts_rect]
     return cnts_rect
 
+# card information needed by the scanner, kept small so it can be cached
+CardInfo = collections.namedtuple("CardInfo", ["id", "name", "set_name", "rarity", "price"])
+
+def card_info_from_card(card):
+    """
+    [card] Card object returned by the Pokemon TCG API
+    [return] CardInfo of the card, price is the TCGplayer market price of the first of the
+             holofoil, normal and reverseHolofoil variants that has one, None if none has
+    """
+    price = None
+    if card.tcgplayer and card.tcgplayer.prices:
+        prices = card.tcgplayer.prices
+        for variant in (prices.holofoil, prices.normal, prices.reverseHolofoil):
+            if variant and variant.market is not None:
+                price = variant.market
+                break
+    return CardInfo(card.id, card.name, card.set.name, card.rarity, price)
+
+class CardInfoCache:
+    """
+    Two tier cache in front of the Pokemon TCG API.
+    Recently used cards are kept in an in-memory LRU, everything that was ever
+    looked up is kept in a SQLite file. Static fields (name, set, rarity) and the
+    price expire separately, so a card is only fetched again once its price is stale
+    """
+    def __init__(self, db_path=CARD_CACHE_PATH, fetch=Card.find, max_items=512,
+                 static_ttl=STATIC_TTL, price_ttl=PRICE_TTL, clock=time.time):
+        """
+        [db_path] path of the SQLite file, ":memory:" to keep the disk tier in memory
+        [fetch] function that looks a card up by id and returns a Card (or CardInfo)
+        [max_items] number of cards kept in the in-memory tier
+        [static_ttl] seconds the static fields stay valid
+        [price_ttl] seconds the price stays valid
+        [clock] function returning the current time in seconds
+        """
+        self.fetch = fetch
+        self.max_items = max_items
+        self.static_ttl = static_ttl
+        self.price_ttl = price_ttl
+        self.clock = clock
+        self.memory = collections.OrderedDict()     # id -> (CardInfo, static fetched at, price fetched at)
+        self.stats = collections.Counter()          # memory_hits, disk_hits, misses, stale, errors
+        self.lock = threading.Lock()
+        self.db = sqlite3.connect(db_path, check_same_thread=False)
+        self.db.execute("""CREATE TABLE IF NOT EXISTS cards (
+                id TEXT PRIMARY KEY, name TEXT, set_name TEXT, rarity TEXT,
+                static_fetched REAL, price REAL, price_fetched REAL)""")
+        self.db.commit()
+
+    def _fresh(self, entry, now):
+        _, static_fetched, price_fetched = entry
+        return now - static_fetched < self.static_ttl and now - price_fetched < self.price_ttl
+
+    def _remember(self, card_id, entry):
+        self.memory[card_id] = entry
+        self.memory.move_to_end(card_id)
+        while len(self.memory) > self.max_items:
+            self.memory.popitem(last=False)
+
+    def _load(self, card_id):
+        row = self.db.execute("SELECT id, name, set_name, rarity, static_fetched, price, price_fetched "
+                              "FROM cards WHERE id = ?", (card_id,)).fetchone()
+        if row is None:
+            return None
+        card_id, name, set_name, rarity, static_fetched, price, price_fetched = row
+        return CardInfo(card_id, name, set_name, rarity, price), static_fetched, price_fetched
+
+    def _store(self, info, static_fetched, price_fetched):
+        self.db.execute("INSERT OR REPLACE INTO cards VALUES (?, ?, ?, ?, ?, ?, ?)",
+                        (info.id, info.name, info.set_name, info.rarity, static_fetched, info.price, price_fetched))
+        self.db.commit()
+
+    def get(self, card_id):
+        """
+        look a card up, going to the API only when the cached copy is missing or expired.
+        If the API call fails, an expired copy is returned rather than nothing
+        [card_id] card id (e.g. "xy1-1")
+        [return] CardInfo of the card
+        """
+        now = self.clock()
+        with self.lock:
+            entry = self.memory.get(card_id)
+            if entry is not None and self._fresh(entry, now):
+                self.memory.move_to_end(card_id)
+                self.stats["memory_hits"] += 1
+                return entry[0]
+            if entry is None:
+                entry = self._load(card_id)
+                if entry is not None and self._fresh(entry, now):
+                    self._remember(card_id, entry)
+                    self.stats["disk_hits"] += 1
+                    return entry[0]
+            self.stats["misses"] += 1
+
+        # fetch outside the lock so other lookups are not blocked by the network
+        try:
+            card = self.fetch(card_id)
+        except Exception as e:
+            with self.lock:
+                self.stats["errors"] += 1
+                if entry is not None:
+                    self.stats["stale"] += 1
+            if entry is None:
+                raise
+            print(f"Card lookup for {card_id} failed, using cached copy: {e}")
+            return entry[0]
+        info = card if isinstance(card, CardInfo) else card_info_from_card(card)
+
+        # static fields that are still valid keep their original timestamp
+        static_fetched = now
+        if entry is not None and now - entry[1] < self.static_ttl:
+            static_fetched = entry[1]
+        with self.lock:
+            self._remember(card_id, (info, static_fetched, now))
+            self._store(info, static_fetched, now)
+        return info
+
+    def close(self):
+        self.db.close()
+
+
 def display_card_info(card, api_base_url):
     """
     Display card information in a window.
-    [card] card object containing information
+    [card] CardInfo of the card
     """
     info_img = np.zeros((400, 600, 3), dtype=np.uint8)
     cv2.putText(info_img, f"Name: {card.name}", (10, 30), cv2.FONT_HERSHEY_SIMPLEX, 0.7, (255, 255, 255), 2)
-    cv2.putText(info_img, f"Set: {card.set.name}", (10, 70), cv2.FONT_HERSHEY_SIMPLEX, 0.7, (255, 255, 255), 2)
+    cv2.putText(info_img, f"Set: {card.set_name}", (10, 70), cv2.FONT_HERSHEY_SIMPLEX, 0.7, (255, 255, 255), 2)
     cv2.putText(info_img, f"Rarity: {card.rarity}", (10, 110), cv2.FONT_HERSHEY_SIMPLEX, 0.7, (255, 255, 255), 2)
-    if card.tcgplayer and card.tcgplayer.prices and card.tcgplayer.prices.holofoil:
-        price = card.tcgplayer.prices.holofoil.market
-        cv2.putText(info_img, f"Price: ${price:.2f}", (10, 150), cv2.FONT_HERSHEY_SIMPLEX, 0.7, (255, 255, 255), 2)
+    if card.price is not None:
+        cv2.putText(info_img, f"Price: ${card.price:.2f}", (10, 150), cv2.FONT_HERSHEY_SIMPLEX, 0.7, (255, 255, 255), 2)
     else:
         cv2.putText(info_img, "Price: None", (10, 150), cv2.FONT_HERSHEY_SIMPLEX, 0.7, (255, 255, 255), 2)
     cv2.putText(info_img, f"API URL: {api_base_url}/{card.id}", (10, 190), cv2.FONT_HERSHEY_SIMPLEX, 0.5, (255, 255, 255), 1)
     cv2.imshow("Card Information", info_img)
 
-def detect_frame(frame, card_hashes, hash_size, api_base_url, api_key=None, display=False, debug=False, thresh_c=5, kernel_size=(3,3), size_thresh=10000):
+# a card found in a frame: matched card name, Hamming distance and 4 point contour
+Detection = collections.namedtuple("Detection", ["name", "dist", "quad"])
+
+def box_iou(a, b):
+    """
+    intersection over union of two (x, y, w, h) boxes
+    """
+    ix = max(0, min(a[0] + a[2], b[0] + b[2]) - max(a[0], b[0]))
+    iy = max(0, min(a[1] + a[3], b[1] + b[3]) - max(a[1], b[1]))
+    inter = ix * iy
+    union = a[2] * a[3] + b[2] * b[3] - inter
+    return inter / union if union > 0 else 0.0
+
+class CardTracker:
+    """
+    Links card contours across frames by the IoU of their bounding boxes, so a card
+    that has not moved keeps its identification instead of being warped and hashed
+    again every frame. A card is identified again when it moves away from where it
+    was last identified, when its match was not confident, or every reidentify_every frames
+    """
+    class Track:
+        def __init__(self, box, match):
+            self.box = box              # bounding box in the latest frame
+            self.id_box = box           # bounding box when the card was last identified
+            self.match = match          # (card name, Hamming distance) or None
+            self.since_id = 0           # frames since the card was last identified
+            self.missed = 0             # frames in a row the card was not seen
+
+    def __init__(self, link_iou=0.5, stable_iou=0.9, confident_dist=32, reidentify_every=30, max_missed=5):
+        """
+        [link_iou] minimum IoU to link a contour to an existing track
+        [stable_iou] minimum IoU with the box of the last identification to reuse it
+        [confident_dist] matches further away than this are identified again every frame
+        [reidentify_every] frames after which a stable card is identified again anyway
+        [max_missed] frames a track is kept without seeing its card
+        """
+        self.link_iou = link_iou
+        self.stable_iou = stable_iou
+        self.confident_dist = confident_dist
+        self.reidentify_every = reidentify_every
+        self.max_missed = max_missed
+        self.tracks = []
+        self.stats = collections.Counter()      # identified, reused
+        self.started = time.perf_counter()
+
+    def update(self, quads, identify):
+        """
+        link the card contours of a new frame to the tracks and identify the cards that need it
+        [quads] 4 point contours of the cards in the frame (see find_card)
+        [identify] function taking a contour and returning (card name, Hamming distance) or None
+        [return] list of Detection of the cards that matched the card pool
+        """
+        unmatched = list(self.tracks)
+        detections = []
+        for quad in quads:
+            box = cv2.boundingRect(quad)
+            track = max(unmatched, key=lambda t: box_iou(box, t.box), default=None)
+            if track is not None and box_iou(box, track.box) >= self.link_iou:
+                unmatched.remove(track)
+            else:
+                track = CardTracker.Track(box, None)
+                track.since_id = None
+                self.tracks.append(track)
+
+            stable = (track.since_id is not None
+                      and track.since_id < self.reidentify_every
+                      and track.match is not None
+                      and track.match[1] <= self.confident_dist
+                      and box_iou(box, track.id_box) >= self.stable_iou)
+            if stable:
+                track.since_id += 1
+                self.stats["reused"] += 1
+            else:
+                track.match = identify(quad)
+                track.id_box = box
+                track.since_id = 0
+                self.stats["identified"] += 1
+            track.box = box
+            track.missed = 0
+            if track.match is not None:
+                detections.append(Detection(track.match[0], track.match[1], quad))
+
+        # forget cards that have not been seen for a while
+        for track in unmatched:
+            track.missed += 1
+        self.tracks = [t for t in self.tracks if t.missed <= self.max_missed]
+        return detections
+
+    def report(self):
+        """
+        [return] dictionary with the number of identifications done and saved, and the savings per second
+        """
+        elapsed = max(time.perf_counter() - self.started, 1e-9)
+        return {"identified": self.stats["identified"],
+                "reused": self.stats["reused"],
+                "hashes_saved_per_sec": round(self.stats["reused"] / elapsed, 1)}
+
+def identify_card(frame, approx, matcher, hash_size, max_dist=None, profiler=NULL_PROFILER, buffers=None):
+    """
+    warp a card out of the frame and find it in the card pool
+    [frame] input frame
+    [approx] 4 point contour of the card
+    [matcher] hash backend of the card pool (see HASH_BACKENDS)
+    [hash_size] pHash hash size
+    [max_dist] maximum Hamming distance of a match
+    [profiler] StageProfiler recording the "warp", "glare", "hash" and "match" stages
+    [buffers] FrameBuffers reused by the glare removal
+    [return] (card name, Hamming distance), or None if no card is close enough
+    """
+    # Get the card image
+    pts = approx.reshape(4, 2)
+    with profiler.stage("warp"):
+        warped = four_point_transform(frame, pts)
+    with profiler.stage("glare"):
+        warped = remove_glare(warped, buffers)
+
+    # Compare the card image with the database
+    # (hashed the same way as the card pool so the distances are comparable)
+    with profiler.stage("hash"):
+        sig = card_signature(warped, hash_size)
+    with profiler.stage("match"):
+        matches = matcher.query(sig, max_dist, k=1)
+    return matches[0] if matches else None
+
+def detect_cards(frame, matcher, hash_size, max_dist=None, tracker=None, thresh_c=5, kernel_size=(3,3), size_thresh=10000, detect_scale=1.0, profiler=NULL_PROFILER, buffers=None):
+    """
+    find and identify all the cards in the input frame, without looking them up
+    [frame] input frame
+    [matcher] hash backend of the card pool (see HASH_BACKENDS)
+    [hash_size] pHash hash size
+    [max_dist] maximum Hamming distance of a match, cards further away are skipped as unknown
+    [tracker] CardTracker that carries identifications over from earlier frames, None to identify every card
+    [thresh_c] value of the constant C for adaptive thresholding
+    [kernel_size] dimension of the kernel used for dilation and erosion
+    [size_thresh] threshold in pixels of the contour to be a candidate
+    [detect_scale] factor the frame is downscaled by for the contour search (see find_card)
+    [profiler] StageProfiler recording the stage timings
+    [buffers] FrameBuffers reused from frame to frame, None to allocate new ones
+    [return] list of Detection
+    """
+    if buffers is None:
+        buffers = FrameBuffers()
+    quads = find_card(frame, thresh_c, kernel_size, size_thresh, detect_scale, profiler, buffers)
+
+    def identify(approx):
+        return identify_card(frame, approx, matcher, hash_size, max_dist, profiler, buffers)
+
+    if tracker is not None:
+        return tracker.update(quads, identify)
+    detections = []
+    for approx in quads:
+        match = identify(approx)
+        if match is not None:
+            detections.append(Detection(match[0], match[1], approx))
+    return detections
+
+def detect_frame(frame, card_hashes, hash_size, api_base_url, api_key=None, display=False, debug=False, thresh_c=5, kernel_size=(3,3), size_thresh=10000, max_dist=None, card_cache=None, tracker=None, detect_scale=1.0, buffers=None):
     """
     identify all the cards in the input frame
     [frame] input frame
-    [card_hashes] dictionary of card hashes
+    [card_hashes] hash backend of the card pool (see HASH_BACKENDS, a dictionary of card hashes is also accepted)
     [hash_size] pHash hash size
     [api_base_url] base URL for the
     [api_key] API key for the Pokemon TCG API
     [display] whether to display the result
-    [debug] whether to display debug information
+    [debug] whether to profile the stages and draw the timings on the frame (True or a StageProfiler)
     [thresh_c] value of the constant C for adaptive thresholding
     [kernel_size] dimension of the kernel used for dilation and erosion
     [size_thresh] threshold in pixels of the contour to be a candidate
-    [return] list of detected cards
+    [max_dist] maximum Hamming distance of a match, cards further away are skipped as unknown
+    [card_cache] CardInfoCache used to look the cards up, None to always ask the API
+    [tracker] CardTracker that carries identifications over from earlier frames, None to identify every card
+    [detect_scale] factor the frame is downscaled by for the contour search (see find_card)
+    [buffers] FrameBuffers reused from frame to frame, None to allocate new ones
+    [return] list of CardInfo of the detected cards
     """
-    # Preprocessing the frame
-    frame_gray = cv2.cvtColor(frame, cv2.COLOR_BGR2GRAY)
-    frame_blur = cv2.medianBlur(frame_gray, 5)
-    frame_thresh = cv2.adaptiveThreshold(frame_blur, 255, cv2.ADAPTIVE_THRESH_MEAN_C, cv2.THRESH_BINARY_INV, 5, thresh_c)
+    matcher = HashMatcher.from_dict(card_hashes) if isinstance(card_hashes, dict) else card_hashes
+    profiler = get_profiler(debug)
 
-    # Dilate and erode the image to remove minor noises
-    kernel = np.ones(kernel_size, np.uint8)
-    frame_dilate = cv2.dilate(frame_thresh, kernel, iterations=1)
-    frame_erode = cv2.erode(frame_dilate, kernel, iterations=1)
+    # Find the cards and identify them, cards that are not close enough to the pool are skipped
+    detections = detect_cards(frame, matcher, hash_size, max_dist, tracker, thresh_c, kernel_size, size_thresh, detect_scale, profiler, buffers)
 
-    # Find contours ----
-    cnts, hier = cv2.findContours(frame_erode, cv2.RETR_TREE, cv2.CHAIN_APPROX_SIMPLE)
-    if len(cnts) == 0:
-        return []
-    
-    # Filter contours and process each card
+    # Process each card
     cards = []
-    stack = [(0, hier[0][0])]
-    while len(stack) > 0:
-        i_cnt, h = stack.pop()
-        i_next, i_prev, i_child, i_parent = h
+    for card_name, min_dist, approx in detections:
 
-        if i_next != -1:
-            stack.append((i_next, hier[0][i_next]))
+        # Get the card information
+        with profiler.stage("lookup"):
+            if card_cache is not None:
+                card = card_cache.get(card_name)
+            else:
+                card = card_info_from_card(Card.find(card_name))
+        cards.append(card)
         
-        cnt = cnts[i_cnt]
-        size = cv2.contourArea(cnt)
-        peri = cv2.arcLength(cnt, True)
-        approx = cv2.approxPolyDP(cnt, 0.04 * peri, True)
-
-        if size >= size_thresh and len(approx) == 4:
-            # Get the card image
-            pts = approx.reshape(4, 2)
-            warped = four_point_transform(frame, pts)
-            warped = remove_glare(warped)
-
-            # Compare the card image with the database
-            hash_val = ih.phash(Image.fromarray(warped), hash_size=hash_size)
-            card_name = None
-            min_dist = float('inf')
-            for name, hash_db in card_hashes.items():
-                # MAY HAVE TO BE FIXED ~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~
-                # dist = np.linalg.norm(hash_val.hash.flatten() - hash_db)
-                dist = np.linalg.norm(np.bitwise_xor(hash_val.hash.flatten(), hash_db))
-                if dist < min_dist:
-                    min_dist = dist
-                    card_name = name
-            
-            # Get the card information
-            card = Card.find(card_name)
-            cards.append(card)
-            
-            # Display the card information
-            # if debug:
-            #     print(f"Card detected: {card_name}")
-            #     print(f"Name: {card.name}")
-            #     print(f"Set: {card.set.name}")
-            #     print(f"Rarity: {card.rarity}")
-            #     print(f"Price: {card.tcgplayer.prices.holofoil}")
-            #     print(f"Image: {card.images.large}")
-            #     print(f"API URL: {api_base_url}/{card.id}")
-            
+        # Display the card information
+        # if debug:
+        #     print(f"Card detected: {card_name}")
+        #     print(f"Name: {card.name}")
+        #     print(f"Set: {card.set_name}")
+        #     print(f"Rarity: {card.rarity}")
+        #     print(f"Price: {card.price}")
+        #     print(f"API URL: {api_base_url}/{card.id}")
+        
+        with profiler.stage("draw"):
             # Draw border on detected card
             x, y, w, h = cv2.boundingRect(approx)
             cv2.rectangle(frame, (x, y), (x + w, y + h), (0, 255, 0), 2)
@@ -318,30 +1291,418 @@ def detect_frame(frame, card_hashes, hash_size, api_base_url, api_key=None, disp
                 if recent != card.id:                       # Only updates if new card
                     display_card_info(card, api_base_url)
                     recent = card.id
+
+    profiler.frame_done()
+    if debug:
+        profiler.draw_overlay(frame)
     return cards
 
 
-def main():
+def put_latest(q, item):
+    """
+    put an item into a bounded queue, throwing away the oldest item if it is full
+    [q] queue.Queue with a maxsize
+    [item] item to add
+    [return] number of items that were dropped (0 or 1)
+    """
+    dropped = 0
+    while True:
+        try:
+            q.put_nowait(item)
+            return dropped
+        except queue.Full:
+            try:
+                q.get_nowait()
+                dropped += 1
+            except queue.Empty:
+                pass
+
+class ScannerPipeline:
+    """
+    Runs the scanner as a pipeline of threads connected by bounded queues:
+      capture thread -> detection worker -> lookup workers
+    The UI (the thread calling run()) always draws the most recent frame with the
+    card information known so far, it never waits on detection or the network.
+    When a stage falls behind, stale frames are dropped instead of queued up
+    """
+    def __init__(self, video, matcher, hash_size, api_base_url, card_cache, max_dist=None,
+                 lookup_workers=2, thresh_c=5, kernel_size=(3,3), size_thresh=10000, tracker=None, detect_scale=1.0,
+                 profiler=None):
+        """
+        [video] cv2.VideoCapture (or anything with read() and release())
+        [matcher] hash backend of the card pool (see HASH_BACKENDS)
+        [hash_size] pHash hash size
+        [api_base_url] base URL for the Pokemon TCG API
+        [card_cache] CardInfoCache used to look the cards up
+        [max_dist] maximum Hamming distance of a match
+        [lookup_workers] number of threads doing card lookups
+        [tracker] CardTracker that carries identifications over from earlier frames, None to identify every card
+        [detect_scale] factor the frame is downscaled by for the contour search (see find_card)
+        [profiler] StageProfiler recording the stage timings and drawn on the video, None for no profiling
+        """
+        self.video = video
+        self.matcher = matcher
+        self.hash_size = hash_size
+        self.api_base_url = api_base_url
+        self.card_cache = card_cache
+        self.max_dist = max_dist
+        self.find_args = (thresh_c, kernel_size, size_thresh, detect_scale)
+        self.tracker = tracker
+        self.profiler = profiler
+        self.buffers = FrameBuffers()               # only used by the detection worker
+
+        self.frames = queue.Queue(maxsize=1)        # capture -> detection, only the newest frame
+        self.results = queue.Queue(maxsize=1)       # detection -> UI, only the newest result
+        self.lookups = queue.Queue(maxsize=32)      # detection -> lookup workers, card names
+        self.stop_event = threading.Event()
+        self.lock = threading.Lock()
+        self.card_info = {}                         # card name -> CardInfo, filled in by the lookup workers
+        self.looked_up = {}                         # card name -> card_cache.clock() of its last lookup
+        self.pending = set()                        # card names queued or being looked up
+        self.stats = collections.Counter()          # frames captured / detected / dropped, lookups, errors
+        self.threads = [threading.Thread(target=self._capture_loop, name="capture", daemon=True),
+                        threading.Thread(target=self._detect_loop, name="detect", daemon=True)]
+        self.threads += [threading.Thread(target=self._lookup_loop, name=f"lookup-{i}", daemon=True)
+                         for i in range(lookup_workers)]
+
+    def _capture_loop(self):
+        while not self.stop_event.is_set():
+            ret, frame = self.video.read()
+            if not ret:
+                break
+            self.stats["captured"] += 1
+            self.stats["dropped_frames"] += put_latest(self.frames, frame)
+        put_latest(self.frames, None)               # tell the detection worker there is nothing left
+
+    def _detect_loop(self):
+        while not self.stop_event.is_set():
+            frame = self.frames.get()
+            if frame is None:
+                break
+            profiler = self.profiler or NULL_PROFILER
+            try:
+                detections = detect_cards(frame, self.matcher, self.hash_size, self.max_dist, self.tracker,
+                                          *self.find_args, profiler=profiler, buffers=self.buffers)
+            except Exception as e:
+                # skip the frame instead of ending the detection thread
+                print(f"Card detection failed: {e}")
+                self.stats["detect_errors"] += 1
+                profiler.discard_frame()    # its partial stage times must not end up in the next frame
+                continue
+            for det in detections:
+                self._request_lookup(det.name)
+            profiler.frame_done()
+            self.stats["detected"] += 1
+            self.stats["dropped_results"] += put_latest(self.results, (frame, detections))
+        put_latest(self.results, None)
+
+    def _request_lookup(self, card_name):
+        with self.lock:
+            if card_name in self.pending:
+                return
+            # look a known card up again once its price expired, the cache refreshes it
+            looked_up = self.looked_up.get(card_name)
+            if looked_up is not None and self.card_cache.clock() - looked_up < self.card_cache.price_ttl:
+                return
+            self.pending.add(card_name)
+        try:
+            self.lookups.put_nowait(card_name)
+        except queue.Full:
+            # too many lookups in flight, the card will be asked for again on a later frame
+            with self.lock:
+                self.pending.discard(card_name)
+
+    def _lookup_loop(self):
+        while True:
+            card_name = self.lookups.get()
+            if card_name is None:
+                break
+            try:
+                start = time.perf_counter()
+                info = self.card_cache.get(card_name)
+                if self.profiler is not None:
+                    self.profiler.record("lookup", time.perf_counter() - start)
+                with self.lock:
+                    self.card_info[card_name] = info
+                    self.looked_up[card_name] = self.card_cache.clock()
+                    self.stats["lookups"] += 1
+            except Exception as e:
+                print(f"Card lookup for {card_name} failed: {e}")
+                with self.lock:
+                    self.stats["lookup_errors"] += 1
+            finally:
+                with self.lock:
+                    self.pending.discard(card_name)
+
+    def draw(self, frame, detections):
+        """
+        draw the detected cards and whatever is known about them onto the frame
+        [return] CardInfo of the first detected card that has been looked up, or None
+        """
+        first = None
+        for det in detections:
+            with self.lock:
+                info = self.card_info.get(det.name)
+            x, y, w, h = cv2.boundingRect(det.quad)
+            cv2.rectangle(frame, (x, y), (x + w, y + h), (0, 255, 0), 2)
+            if info is None:
+                label = det.name                    # still being looked up
+            elif info.price is None:
+                label = info.name
+            else:
+                label = f"{info.name} ${info.price:.2f}"
+            cv2.putText(frame, label, (x, max(y - 8, 12)), cv2.FONT_HERSHEY_SIMPLEX, 0.6, (0, 255, 0), 2)
+            if first is None and info is not None:
+                first = info
+        return first
+
+    def run(self):
+        """
+        start the worker threads and run the UI loop until Q is pressed or the video ends
+        """
+        global recent
+        for thread in self.threads:
+            thread.start()
+
+        while True:
+            try:
+                result = self.results.get(timeout=0.01)
+            except queue.Empty:
+                result = ()                         # nothing new, the window keeps showing the last frame
+            if result is None:
+                break
+            if result:
+                # each result is drawn once, so it can be drawn on directly
+                frame, detections = result
+                card = self.draw(frame, detections)
+                if card is not None and recent != card.id:      # Only updates if new card
+                    display_card_info(card, self.api_base_url)
+                    recent = card.id
+                if self.profiler is not None:
+                    self.profiler.draw_overlay(frame)
+                cv2.imshow("Card detection", frame)
+
+            # exit button will be set to Q
+            if cv2.waitKey(1) == ord("q"):
+                break
+        self.stop()
+
+    def stop(self):
+        self.stop_event.set()
+        put_latest(self.frames, None)
+        for _ in self.threads:
+            put_latest(self.lookups, None)
+        for thread in self.threads:
+            thread.join(timeout=1)
+        print(f"Pipeline: {dict(self.stats)}")
+        if self.tracker is not None:
+            print(f"Tracker: {self.tracker.report()}")
+
+
+# state of a batch scan worker process, set up once by _init_scan_worker
+_scan_state = {}
+
+def _init_scan_worker(index_path, hash_size, backend, max_dist, frame_step, detect_scale):
+    index = CardHashIndex.load(index_path, hash_size)
+    _scan_state.update(matcher=make_hash_backend(index, backend), hash_size=hash_size,
+                       max_dist=max_dist, frame_step=frame_step, detect_scale=detect_scale, buffers=FrameBuffers())
+
+def _scan_file(path):
+    """
+    find and identify the cards in one image or video file, runs inside the scan worker processes
+    [path] image or video file
+    [return] (path, list of result rows, number of frames scanned, error message or None)
+    """
+    matcher, hash_size, max_dist = _scan_state["matcher"], _scan_state["hash_size"], _scan_state["max_dist"]
+    rows = []
+
+    def scan_frame(frame, frame_no, tracker=None):
+        for det in detect_cards(frame, matcher, hash_size, max_dist, tracker, detect_scale=_scan_state["detect_scale"],
+                                buffers=_scan_state["buffers"]):
+            x, y, w, h = cv2.boundingRect(det.quad)
+            rows.append({"source": path, "frame": frame_no, "card_id": det.name, "distance": det.dist,
+                         "x": x, "y": y, "w": w, "h": h})
+
+    try:
+        if path.lower().endswith(IMAGE_EXTENSIONS):
+            img = cv2.imread(path)
+            if img is None:
+                return path, rows, 0, "unreadable or corrupt image"
+            scan_frame(img, 0)
+            return path, rows, 1, None
+
+        video = cv2.VideoCapture(path)
+        if not video.isOpened():
+            return path, rows, 0, "could not open video"
+        # the tracker keeps a card that stays in view from being hashed on every frame
+        tracker = CardTracker()
+        frame_no = 0
+        scanned = 0
+        while True:
+            ret, frame = video.read()
+            if not ret:
+                break
+            if frame_no % _scan_state["frame_step"] == 0:
+                scan_frame(frame, frame_no, tracker)
+                scanned += 1
+            frame_no += 1
+        video.release()
+        return path, rows, scanned, None
+    except Exception as e:          # one bad file must not abort the whole scan
+        return path, rows, 0, str(e)
+
+def list_scan_files(paths):
+    """
+    [paths] image files, video files or folders containing them
+    [return] sorted list of image and video files
+    """
+    files = []
+    for path in paths:
+        if os.path.isdir(path):
+            for root, _, filenames in os.walk(path):
+                files += [os.path.join(root, f) for f in filenames
+                          if f.lower().endswith(IMAGE_EXTENSIONS + VIDEO_EXTENSIONS)]
+        else:
+            files.append(path)
+    return sorted(files)
+
+SCAN_FIELDS = ["source", "frame", "card_id", "distance", "x", "y", "w", "h"]
+LOOKUP_FIELDS = ["name", "set_name", "rarity", "price"]
+
+def batch_scan(paths, output, workers=None, frame_step=1, lookup=False, hash_size=16,
+               backend=HASH_BACKEND, max_dist=MAX_HASH_DIST, detect_scale=DETECT_SCALE):
+    """
+    scan folders of images and video files without opening any windows, one file per worker process.
+    Every detected card is written as one row to a CSV or JSONL file
+    [paths] image files, video files or folders containing them
+    [output] .csv or .jsonl file to write the results to
+    [workers] number of worker processes, None for one per CPU
+    [frame_step] only every frame_step-th frame of a video is scanned
+    [lookup] whether to add the card information (name, set, rarity, price) to each row
+    [detect_scale] factor the frames are downscaled by for the contour search (see find_card)
+    [return] dictionary with the totals and throughput of the scan
+    """
+    # make sure the index is up to date before the workers load it
+    load_hash_index(CARD_POOL, HASH_INDEX_PATH, hash_size, workers=workers)
+    files = list_scan_files(paths)
+    card_cache = CardInfoCache() if lookup else None
+    fields = SCAN_FIELDS + (LOOKUP_FIELDS if lookup else [])
+    totals = collections.Counter()
+
+    start = time.perf_counter()
+    with open(output, "w", newline="") as f:
+        as_jsonl = output.lower().endswith(".jsonl")
+        writer = None if as_jsonl else csv.DictWriter(f, fieldnames=fields)
+        if writer is not None:
+            writer.writeheader()
+
+        with ProcessPoolExecutor(max_workers=workers, initializer=_init_scan_worker,
+                                 initargs=(HASH_INDEX_PATH, hash_size, backend, max_dist, frame_step, detect_scale)) as pool:
+            futures = [pool.submit(_scan_file, path) for path in files]
+            for future in as_completed(futures):
+                path, rows, scanned, error = future.result()
+                totals["files"] += 1
+                totals["frames"] += scanned
+                if error is not None:
+                    totals["errors"] += 1
+                    print(f"Skipping {path}: {error}")
+                for row in rows:
+                    if card_cache is not None:
+                        try:
+                            info = card_cache.get(row["card_id"])
+                            row.update(name=info.name, set_name=info.set_name, rarity=info.rarity, price=info.price)
+                        except Exception as e:
+                            print(f"Card lookup for {row['card_id']} failed: {e}")
+                    if as_jsonl:
+                        f.write(json.dumps(row) + "\n")
+                    else:
+                        writer.writerow(row)
+                totals["cards"] += len(rows)
+                print(f"{path}: {len(rows)} cards in {scanned} frames")
+
+    elapsed = time.perf_counter() - start
+    if card_cache is not None:
+        card_cache.close()
+    report = dict(totals, seconds=round(elapsed, 2),
+                  files_per_sec=round(totals["files"] / max(elapsed, 1e-9), 2),
+                  frames_per_sec=round(totals["frames"] / max(elapsed, 1e-9), 2))
+    print(f"Scanned {totals['files']} files ({totals['frames']} frames, {totals['cards']} cards) in {elapsed:.1f}s: "
+          f"{report['frames_per_sec']} frames/sec, {totals['errors']} errors")
+    return report
+
+
+def parse_args(argv=None):
+    parser = argparse.ArgumentParser(description="Pokemon TCG Scanner")
+    subparsers = parser.add_subparsers(dest="command")
+
+    camera = subparsers.add_parser("camera", help="scan cards from a camera (default)")
+    camera.add_argument("--camera", type=int, default=1, help="camera index for cv2.VideoCapture")
+    camera.add_argument("--profile", action="store_true", help="draw per-stage timings on the video")
+    camera.add_argument("--profile-out", default=PROFILE_REPORT_PATH, help="JSON file the timings are written to on exit")
+
+    scan = subparsers.add_parser("scan", help="scan image folders and video files without opening windows")
+    scan.add_argument("paths", nargs="+", help="image files, video files or folders containing them")
+    scan.add_argument("-o", "--output", default="scan_results.csv", help="results file, .csv or .jsonl")
+    scan.add_argument("-j", "--workers", type=int, default=None, help="worker processes (default: one per CPU)")
+    scan.add_argument("--frame-step", type=int, default=1, help="only scan every n-th frame of a video")
+    scan.add_argument("--lookup", action="store_true", help="add name, set, rarity and price of each card")
+    scan.add_argument("--backend", choices=list(HASH_BACKENDS), default=HASH_BACKEND, help="nearest-hash search backend")
+    scan.add_argument("--max-dist", type=int, default=MAX_HASH_DIST, help="maximum Hamming distance of a match")
+    scan.add_argument("--detect-scale", type=float, default=DETECT_SCALE,
+                      help="downscale factor for the contour search, 1 for full resolution")
+    return parser.parse_args(argv)
+
+
+def main(camera_index=1, profile=False, profile_out=PROFILE_REPORT_PATH):
     # RestClient.configure( REDACTED API )
 
-    video = cv2.VideoCapture(1)
+    # hash the card pool once, only new or changed images are hashed again
+    matcher = make_hash_backend(load_hash_index(CARD_POOL, HASH_INDEX_PATH, 16), HASH_BACKEND)
 
-    while True:
-        # Capture the video feed
-        ret, frame = video.read()
-        card_hashes = calc_image_hashes("Pokemon-TCG-Tracker/Card-Images")
-        cards = detect_frame(frame, card_hashes, 16, "https://api.pokemontcgio/v2/cards", display=True, debug=True)
-    
-        # Open up a window called "Card Detection" and displays video
-        cv2.imshow("Card detection", frame)
-    
-        # exit button will be set to Q
-        if cv2.waitKey(1) == ord("q"):
-            break
+    # card information is cached so a card held in front of the camera is only looked up once
+    card_cache = CardInfoCache()
+
+    # cards that stay in place keep their identification instead of being hashed every frame
+    tracker = CardTracker()
+
+    # per-stage timings, drawn on the video and written to a JSON report on exit
+    profiler = StageProfiler() if profile else None
+
+    video = cv2.VideoCapture(camera_index)
+
+    if PIPELINED:
+        pipeline = ScannerPipeline(video, matcher, 16, API_BASE_URL, card_cache, max_dist=MAX_HASH_DIST,
+                                   tracker=tracker, detect_scale=DETECT_SCALE, profiler=profiler)
+        pipeline.run()
+    else:
+        buffers = FrameBuffers()
+        while True:
+            # Capture the video feed
+            ret, frame = video.read()
+            cards = detect_frame(frame, matcher, 16, API_BASE_URL, display=True, debug=profiler, max_dist=MAX_HASH_DIST, card_cache=card_cache, tracker=tracker, detect_scale=DETECT_SCALE, buffers=buffers)
+
+            # Open up a window called "Card Detection" and displays video
+            cv2.imshow("Card detection", frame)
+
+            # exit button will be set to Q
+            if cv2.waitKey(1) == ord("q"):
+                break
 
     # Release the video feed and close all windows
     video.release()
     cv2.destroyAllWindows()
+    print(f"Card cache: {dict(card_cache.stats)}")
+    if not PIPELINED:
+        print(f"Tracker: {tracker.report()}")
+    if profiler is not None:
+        profiler.save_json(profile_out)
+        print(f"Stage timings written to {profile_out}")
+    card_cache.close()
 
 if __name__ == "__main__":
-    main()
\ No newline at end of file
+    args = parse_args()
+    if args.command == "scan":
+        batch_scan(args.paths, args.output, workers=args.workers, frame_step=args.frame_step, lookup=args.lookup,
+                   backend=args.backend, max_dist=args.max_dist, detect_scale=args.detect_scale)
+    else:
+        main(getattr(args, "camera", 1), getattr(args, "profile", False), getattr(args, "profile_out", PROFILE_REPORT_PATH))
\ No newline at end of file
@@ -0,0 +1,333 @@
+"""
+Dominick Jean
+
+Pokemon TCG Scanner - benchmarks
+"""
+import argparse
+import importlib.util
+import os
+import sys
+import time
+import tracemalloc
+import types
+
+import cv2
+import numpy as np
+
+# the scanner file name has a dash in it, so it has to be loaded by path
+_spec = importlib.util.spec_from_file_location(
+    "pokemon_tcg_tracker", os.path.join(os.path.dirname(os.path.abspath(__file__)), "PokemonTCG-Tracker.py"))
+tracker = importlib.util.module_from_spec(_spec)
+sys.modules[_spec.name] = tracker   # so worker processes can unpickle its functions
+_spec.loader.exec_module(tracker)
+
+
+def random_pool(n_cards, hash_size=16, seed=0):
+    """
+    build a random card pool
+    [n_cards] number of cards in the pool
+    [hash_size] pHash hash size
+    [return] dictionary of card hashes in the calc_image_hashes format
+    """
+    rng = np.random.default_rng(seed)
+    bits = rng.integers(0, 2, size=(n_cards, hash_size * hash_size), dtype=np.uint8).astype(bool)
+    return {f"card-{i}": bits[i] for i in range(n_cards)}
+
+
+def loop_match(card_hashes, hash_bits):
+    """
+    the per-card loop detect_frame used before HashMatcher
+    """
+    card_name = None
+    min_dist = float('inf')
+    for name, hash_db in card_hashes.items():
+        dist = np.linalg.norm(np.bitwise_xor(hash_bits, hash_db))
+        if dist < min_dist:
+            min_dist = dist
+            card_name = name
+    return card_name, min_dist
+
+
+def time_per_query(fn, queries, repeat):
+    start = time.perf_counter()
+    for _ in range(repeat):
+        for q in queries:
+            fn(q)
+    return (time.perf_counter() - start) / (repeat * len(queries))
+
+
+def bench_matcher(sizes=(1000, 10000, 50000), n_queries=20, hash_size=16):
+    """
+    compare the old Python loop with the vectorized HashMatcher
+    [sizes] card pool sizes to test
+    [n_queries] number of query hashes per pool size
+    """
+    print(f"{'cards':>8} {'loop ms':>10} {'matcher ms':>11} {'speedup':>8}")
+    for n_cards in sizes:
+        card_hashes = random_pool(n_cards, hash_size)
+        matcher = tracker.HashMatcher.from_dict(card_hashes)
+        names = list(card_hashes)
+        rng = np.random.default_rng(1)
+        queries = []
+        for i in rng.integers(0, n_cards, size=n_queries):
+            # a noisy copy of a card in the pool
+            q = card_hashes[names[i]].copy()
+            flip = rng.integers(0, q.size, size=10)
+            q[flip] = ~q[flip]
+            queries.append(q)
+
+        # both have to agree on the best match
+        # (the loop returns the euclidean norm of the XOR, i.e. sqrt of the Hamming distance)
+        for q in queries[:3]:
+            assert round(loop_match(card_hashes, q)[1] ** 2) == matcher.match(q, k=1)[0][1]
+
+        loop_repeat = max(1, 2000 // n_cards)
+        loop_t = time_per_query(lambda q: loop_match(card_hashes, q), queries[:5], loop_repeat)
+        matcher_t = time_per_query(lambda q: matcher.match(q, k=5), queries, 5)
+        print(f"{n_cards:>8} {loop_t * 1000:>10.2f} {matcher_t * 1000:>11.3f} {loop_t / matcher_t:>7.0f}x")
+
+
+def random_signatures(n_cards, hash_size=16, seed=0):
+    """
+    build a random card pool with all the signatures of a CardHashIndex
+    [return] object with names, packed, dhash and hist like a CardHashIndex
+    """
+    rng = np.random.default_rng(seed)
+    return types.SimpleNamespace(
+        names=[f"card-{i}" for i in range(n_cards)],
+        packed=rng.integers(0, 256, size=(n_cards, hash_size * hash_size // 8), dtype=np.uint8),
+        dhash=rng.integers(0, 256, size=(n_cards, tracker.DHASH_SIZE ** 2 // 8), dtype=np.uint8),
+        hist=rng.integers(0, 256, size=(n_cards, tracker.HIST_BINS ** 3), dtype=np.uint8))
+
+
+def noisy_signature(index, i, rng, phash_flips=10, dhash_flips=4):
+    """
+    [return] CardSignature of card i of the pool with some bits flipped and histogram noise
+    """
+    phash = np.unpackbits(index.packed[i])
+    phash[rng.integers(0, phash.size, size=phash_flips)] ^= 1
+    dhash = np.unpackbits(index.dhash[i])
+    dhash[rng.integers(0, dhash.size, size=dhash_flips)] ^= 1
+    hist = np.clip(index.hist[i].astype(int) + rng.integers(-8, 9, size=index.hist[i].size), 0, 255)
+    return tracker.CardSignature(np.packbits(phash), np.packbits(dhash), hist.astype(np.uint8))
+
+
+def reprint_signatures(n_cards, variants=4, phash_flips=1, dhash_flips=1, hash_size=16, seed=0):
+    """
+    build a card pool of near duplicates, like the reprints and alternate arts of a card:
+    groups of variants whose pHash and dHash are a few bits apart but whose colors differ
+    [variants] number of cards in each group
+    [phash_flips] [dhash_flips] bits flipped between a variant and its group's hashes
+    [return] object with names, packed, dhash and hist like a CardHashIndex
+    """
+    rng = np.random.default_rng(seed)
+    base = random_signatures(-(-n_cards // variants), hash_size, seed)
+    group = np.arange(n_cards) // variants
+    phash = np.unpackbits(base.packed[group], axis=1)
+    dhash = np.unpackbits(base.dhash[group], axis=1)
+    for bits, flips in ((phash, phash_flips), (dhash, dhash_flips)):
+        for row in bits:
+            row[rng.choice(row.size, size=flips, replace=False)] ^= 1
+    return types.SimpleNamespace(
+        names=[f"card-{g}-v{i % variants}" for i, g in enumerate(group)],
+        packed=np.packbits(phash, axis=1), dhash=np.packbits(dhash, axis=1),
+        hist=rng.integers(0, 256, size=(n_cards, tracker.HIST_BINS ** 3), dtype=np.uint8))
+
+
+def bench_backends(sizes=(1000, 10000, 50000), n_queries=50, hash_size=16, max_dist=48):
+    """
+    compare the nearest-hash search backends on known (noisy copies of pool cards)
+    and unknown (random) query signatures, and how often they find the right card.
+    Every size is run on a random pool, where any backend finds the card, and on a
+    pool of reprints (see reprint_signatures), where the pHash alone can't tell the
+    variants of a card apart
+    [sizes] card pool sizes to test
+    [n_queries] number of query signatures of each kind per pool size
+    [max_dist] maximum Hamming distance of a match
+    """
+    print(f"{'cards':>8} {'pool':>9} {'backend':>8} {'build s':>8} {'known ms':>9} {'unknown ms':>11} {'top-1':>6}")
+    for n_cards in sizes:
+        for kind, pool in (("random", random_signatures(n_cards, hash_size)),
+                           ("reprints", reprint_signatures(n_cards, hash_size=hash_size))):
+            rng = np.random.default_rng(2)
+            known_ids = rng.integers(0, n_cards, size=n_queries)
+            known = [noisy_signature(pool, i, rng) for i in known_ids]
+            unknown = [noisy_signature(random_signatures(1, hash_size, seed=100 + j), 0, rng) for j in range(n_queries)]
+
+            for backend, cls in tracker.HASH_BACKENDS.items():
+                start = time.perf_counter()
+                index = cls.from_index(pool)
+                build_t = time.perf_counter() - start
+                known_t = time_per_query(lambda q: index.query(q, max_dist), known, 1)
+                unknown_t = time_per_query(lambda q: index.query(q, max_dist), unknown, 1)
+                hits = 0
+                for i, q in zip(known_ids, known):
+                    top = index.query(q, max_dist)
+                    hits += bool(top) and top[0][0] == pool.names[i]
+                print(f"{n_cards:>8} {kind:>9} {backend:>8} {build_t:>8.2f} {known_t * 1000:>9.3f} "
+                      f"{unknown_t * 1000:>11.3f} {hits / n_queries:>6.0%}")
+
+
+def load_card_images():
+    """
+    [return] list of the card images in the card pool
+    """
+    pool = tracker.CARD_POOL if os.path.isdir(tracker.CARD_POOL) else os.path.join(os.path.dirname(__file__), "Card-Images")
+    card_images = [cv2.imread(os.path.join(pool, f)) for f in sorted(os.listdir(pool))
+                   if f.endswith(tracker.IMAGE_EXTENSIONS)]
+    return [img for img in card_images if img is not None]
+
+
+def synthetic_scene(card_images, size, n_cards, rng):
+    """
+    paste cards with a slight perspective onto a noisy background
+    [card_images] list of BGR card images
+    [size] (width, height) of the frame
+    [n_cards] number of cards in the frame
+    [return] (frame, list of ground truth (x, y, w, h) boxes)
+    """
+    width, height = size
+    frame = rng.integers(30, 90, size=(height, width, 3), dtype=np.uint8)
+    frame = cv2.GaussianBlur(frame, (7, 7), 0)
+    boxes = []
+    cell_w = width // n_cards
+    card_h = int(height * 0.6)
+    for i in range(n_cards):
+        img = card_images[rng.integers(len(card_images))]
+        card_w = card_h * img.shape[1] // img.shape[0]
+        x0 = i * cell_w + (cell_w - card_w) // 2
+        y0 = (height - card_h) // 2
+        jitter = card_h * 0.03
+        dst = np.float32([[x0, y0], [x0 + card_w, y0], [x0 + card_w, y0 + card_h], [x0, y0 + card_h]])
+        dst += rng.uniform(-jitter, jitter, size=dst.shape).astype(np.float32)
+        src = np.float32([[0, 0], [img.shape[1], 0], [img.shape[1], img.shape[0]], [0, img.shape[0]]])
+        mat = cv2.getPerspectiveTransform(src, dst)
+        warped = cv2.warpPerspective(img, mat, (width, height))
+        mask = cv2.warpPerspective(np.full(img.shape[:2], 255, np.uint8), mat, (width, height))
+        frame[mask > 0] = warped[mask > 0]
+        boxes.append(cv2.boundingRect(dst.astype(np.int32)))
+    return frame, boxes
+
+
+def bench_detect_scale(scales=(1.0, 0.75, 0.5, 0.35, 0.25), n_frames=10, n_cards=3):
+    """
+    fps and recall of the card contour search at different detection scales, at 1080p and 4K.
+    A card counts as found when a contour's bounding box has an IoU of at least 0.8 with it
+    [scales] detection scales to test
+    [n_frames] number of synthetic frames per resolution
+    [n_cards] number of cards per frame
+    """
+    card_images = load_card_images()
+    print(f"{'frame':>10} {'scale':>6} {'ms/frame':>9} {'fps':>7} {'recall':>7}")
+    for size in ((1920, 1080), (3840, 2160)):
+        rng = np.random.default_rng(3)
+        scenes = [synthetic_scene(card_images, size, n_cards, rng) for _ in range(n_frames)]
+        # the size threshold is scaled with the resolution so both find the same cards
+        size_thresh = 10000 * (size[0] * size[1]) / (1920 * 1080)
+        for scale in scales:
+            found = 0
+            total = 0
+            start = time.perf_counter()
+            for frame, _ in scenes:
+                tracker.find_card(frame, size_thresh=size_thresh, scale=scale)
+            elapsed = (time.perf_counter() - start) / n_frames
+            for frame, boxes in scenes:
+                quads = tracker.find_card(frame, size_thresh=size_thresh, scale=scale)
+                found_boxes = [cv2.boundingRect(q) for q in quads]
+                for box in boxes:
+                    total += 1
+                    if any(tracker.box_iou(box, b) >= 0.8 for b in found_boxes):
+                        found += 1
+            print(f"{size[0]}x{size[1]:<5} {scale:>6.2f} {elapsed * 1000:>9.1f} {1 / elapsed:>7.1f} {found / total:>7.0%}")
+
+
+def legacy_preprocess(frame, thresh_c=5, kernel_size=(3,3)):
+    """
+    the detect_frame preprocessing before FrameBuffers, a new array for every step
+    """
+    frame_gray = cv2.cvtColor(frame, cv2.COLOR_BGR2GRAY)
+    frame_blur = cv2.medianBlur(frame_gray, 5)
+    frame_thresh = cv2.adaptiveThreshold(frame_blur, 255, cv2.ADAPTIVE_THRESH_MEAN_C, cv2.THRESH_BINARY_INV, 5, thresh_c)
+    kernel = np.ones(kernel_size, np.uint8)
+    frame_dilate = cv2.dilate(frame_thresh, kernel, iterations=1)
+    return cv2.erode(frame_dilate, kernel, iterations=1)
+
+
+def legacy_remove_glare(img):
+    """
+    remove_glare before FrameBuffers
+    """
+    img_hsv = cv2.cvtColor(img, cv2.COLOR_BGR2HSV)
+    _, s, v = cv2.split(img_hsv)
+    non_sat = (s < 32) * 255
+    disk = cv2.getStructuringElement(cv2.MORPH_ELLIPSE, (3,3))
+    non_sat = cv2.erode(non_sat.astype(np.uint8), disk)
+    v[non_sat == 0] = 0
+    glare = (v > 200) * 255
+    glare = cv2.dilate(glare.astype(np.uint8), disk)
+    glare_reduced = np.ones((img.shape[0], img.shape[1], 3), dtype=np.uint8) * 200
+    glare = cv2.cvtColor(glare, cv2.COLOR_GRAY2BGR)
+    return np.where(glare, glare_reduced, img)
+
+
+def bench_preprocess(n_frames=20, n_cards=3):
+    """
+    time and peak memory allocated per frame by the card search and glare removal,
+    before and after reusing FrameBuffers, on synthetic 1080p frames at full detection scale
+    [n_frames] number of synthetic frames
+    [n_cards] number of cards per frame
+    """
+    card_images = load_card_images()
+    rng = np.random.default_rng(4)
+    scenes = [synthetic_scene(card_images, (1920, 1080), n_cards, rng)[0] for _ in range(n_frames)]
+    quads = [tracker.find_card(frame) for frame in scenes]
+    buffers = tracker.FrameBuffers()
+
+    def before(i):
+        tracker._find_card_contours(legacy_preprocess(scenes[i]), 10000, scenes[i].shape, 1.0)
+        for quad in quads[i]:
+            legacy_remove_glare(tracker.four_point_transform(scenes[i], quad.reshape(4, 2)))
+
+    def after(i):
+        tracker.find_card(scenes[i], buffers=buffers)
+        for quad in quads[i]:
+            tracker.remove_glare(tracker.four_point_transform(scenes[i], quad.reshape(4, 2)), buffers)
+
+    print(f"{'':>8} {'ms/frame':>9} {'peak alloc MB/frame':>20}")
+    for name, fn in (("before", before), ("after", after)):
+        fn(0)       # warm up (and let the buffers be allocated)
+        start = time.perf_counter()
+        for i in range(n_frames):
+            fn(i)
+        elapsed = (time.perf_counter() - start) / n_frames
+
+        peaks = []
+        tracemalloc.start()
+        for i in range(n_frames):
+            tracemalloc.reset_peak()
+            base = tracemalloc.get_traced_memory()[0]
+            fn(i)
+            peaks.append(tracemalloc.get_traced_memory()[1] - base)
+        tracemalloc.stop()
+        print(f"{name:>8} {elapsed * 1000:>9.2f} {np.mean(peaks) / 1e6:>20.2f}")
+
+
+BENCHMARKS = {
+    "matcher": bench_matcher,
+    "backends": bench_backends,
+    "detect_scale": bench_detect_scale,
+    "preprocess": bench_preprocess,
+}
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Pokemon TCG Scanner benchmarks")
+    parser.add_argument("benchmarks", nargs="*", metavar="name",
+                        help=f"benchmarks to run, any of {', '.join(BENCHMARKS)} (default: all)")
+    args = parser.parse_args()
+    unknown = set(args.benchmarks) - set(BENCHMARKS)
+    if unknown:
+        parser.error(f"unknown benchmark(s): {', '.join(sorted(unknown))}")
+    for name in args.benchmarks or BENCHMARKS:
+        print(f"== {name} ==")
+        BENCHMARKS[name]()
+        print()
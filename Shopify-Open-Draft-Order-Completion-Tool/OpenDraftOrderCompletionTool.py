@@ -1,7 +1,24 @@
 import requests
 import certifi
+import argparse
+import bisect
+import json
 import os
+import queue
+import random
+import re
+import ssl
+import threading
 import time
+from collections import Counter
+from datetime import datetime, timedelta, timezone
+from concurrent.futures import ThreadPoolExecutor
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+
+try:
+    import httpx        # optional, only used when HTTP2 is enabled
+except ImportError:
+    httpx = None
 
 # ---------------------- Configuration Section ----------------------
 # List of Shopify store domains to process
@@ -22,79 +39,1093 @@ PAYMENT_PENDING = False
 # Timeout (in seconds) for each HTTP request to Shopify
 REQUEST_TIMEOUT = 15
 
+# URL scheme for the store domains (set SHOPIFY_SCHEME=http in env to talk to a local mock server)
+SHOPIFY_SCHEME = os.getenv("SHOPIFY_SCHEME", "https")
+
+# Maximum number of draftOrderComplete mutations in flight at once per store
+MAX_IN_FLIGHT = 4
+
+# Estimated GraphQL cost of one draftOrderComplete until Shopify reports the real cost
+DEFAULT_MUTATION_COST = 10
+
+# Most draftOrderComplete mutations sent in one GraphQL document (1 disables batching)
+MAX_BATCH_SIZE = 25
+
+# Most query cost Shopify accepts for a single GraphQL document
+MAX_QUERY_COST = 1000
+
+# Attempts per request (first try included) on throttling, timeouts, connection errors and 5xx
+RETRY_ATTEMPTS = 5
+
+# Exponential backoff between attempts: a random delay up to RETRY_BASE_DELAY * 2^(attempt - 1),
+# capped at RETRY_MAX_DELAY seconds (a longer Retry-After from Shopify always wins)
+RETRY_BASE_DELAY = 0.5
+RETRY_MAX_DELAY = 30.0
+
+# Also retry draftOrderComplete when its response was lost (read timeout, dropped connection, 5xx).
+# Safe because Shopify never completes a draft twice, the repeat fails with "already completed".
+RETRY_MUTATIONS = True
+
+# How open draft orders are listed: "rest" pages through draft_orders.json, "bulk" exports them
+# with a GraphQL bulk operation (faster for stores with tens of thousands of open drafts)
+LISTING_BACKEND = "rest"
+
+# Seconds between bulk operation status checks, and the longest to wait for an export
+BULK_POLL_INTERVAL = 2.0
+BULK_TIMEOUT = 3600
+
+# Append-only journal of page cursors and completed drafts, lets an interrupted run resume
+# where it stopped (set DRAFT_JOURNAL in env to move it, or to an empty string to disable it)
+JOURNAL_PATH = os.getenv("DRAFT_JOURNAL", "draft_completion_journal.jsonl")
+
+# Number of draft order pages fetched ahead while the current page is being completed
+PREFETCH_PAGES = 2
+
+# If True, all stores are processed at the same time (each has its own rate limit bucket)
+PARALLEL_SHOPS = True
+
+# HTTP connections kept open per store (0 sizes the pool to MAX_IN_FLIGHT plus one for the listing thread).
+# Requests wait for a free connection instead of opening extra ones that are thrown away afterwards.
+POOL_SIZE = 0
+
+# Keep connections open between requests (False closes every connection after its response)
+KEEP_ALIVE = True
+
+# Send requests over HTTP/2 through httpx if it's installed (pip install "httpx[http2]"), so all requests
+# in flight to a store share one connection. Falls back to the requests connection pool without it.
+HTTP2 = False
+
 # SSL verification for HTTPS requests (set SSL_VERIFY=false in env to disable)
 SSL_VERIFY = os.getenv("SSL_VERIFY", "true").lower() not in ("0", "false", "no")
 
 # Enable verbose debug logging for request URLs and payloads
 # Set DEBUG_LOG_URLS=true in env to enable
-# DEBUG_LOG_URLS = os.getenv("DEBUG_LOG_URLS", "false").lower() not in ("0", "false", "no")
-DEBUG_LOG_URLS = False
+DEBUG_LOG_URLS = os.getenv("DEBUG_LOG_URLS", "false").lower() not in ("0", "false", "no")
+
+# Structured JSON log with one line per HTTP request, retry and store result
+# (set DRAFT_LOG in env to a file path to enable it)
+LOG_PATH = os.getenv("DRAFT_LOG", "")
 
-# Global counters for reporting
+# Prometheus text metrics, written to METRICS_PATH when the run ends (set DRAFT_METRICS in env to enable)
+# and served on http://127.0.0.1:METRICS_PORT/metrics while it runs (set DRAFT_METRICS_PORT in env, 0 disables it)
+METRICS_PATH = os.getenv("DRAFT_METRICS", "")
+METRICS_PORT = int(os.getenv("DRAFT_METRICS_PORT", "0"))
+
+# Upper bounds (seconds) of the request latency histogram buckets
+LATENCY_BUCKETS = (0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0)
+
+# Global counters for reporting (update them through add_to_totals, stores may run concurrently)
 total_open_drafts = 0
 total_completed = 0
+totals_lock = threading.Lock()
 
-# Tag to skip when processing draft orders (e.g., skip orders with this tag)
+# Tag to skip when processing draft orders (e.g., skip orders with this tag, comma-separate several)
 skip_tags = "shipping_charge"
 
+# Only complete draft orders with at least one of these tags (comma-separated, empty for any)
+INCLUDE_TAGS = ""
+
+# Only complete draft orders of these customer IDs (empty for any customer)
+CUSTOMER_IDS = []
+
+# Only complete draft orders created at least MIN_DRAFT_AGE_HOURS ago, and (if set) at most MAX_DRAFT_AGE_DAYS ago
+MIN_DRAFT_AGE_HOURS = 0
+MAX_DRAFT_AGE_DAYS = None
+
 # ---------------------- Credential Check ----------------------
 # Ensure both SHOPS and API_TOKENS are set
 if not SHOPS or not API_TOKENS:
     print("Missing URL or API_TOKEN in environment")
     exit(1)
 
+# ---------------------- Metrics and Logging ----------------------
+
+class Metrics:
+    """
+    Counters, gauges and request latency histograms of a run, labelled by store.
+
+    render() returns them in the Prometheus text format; serve_metrics exposes that
+    while the run goes on and write_metrics saves it when the run ends.
+
+    Thread-safe.
+    """
+
+    def __init__(self, buckets=None):
+        self.lock = threading.Lock()
+        self.buckets = tuple(buckets or LATENCY_BUCKETS)
+        self.requests = Counter()           # (shop, endpoint, status) -> requests
+        self.latency = {}                   # (shop, endpoint) -> requests per bucket, +Inf last
+        self.latency_sum = Counter()        # (shop, endpoint) -> seconds
+        self.throttle_wait = Counter()      # (shop, bucket) -> seconds
+        self.retries = Counter()            # (shop, reason) -> retries
+        self.drafts = Counter()             # (shop, outcome) -> draft orders
+        self.in_flight = Counter()          # shop -> requests in flight
+        self.max_in_flight = Counter()      # shop -> most requests in flight at once
+
+    def request_started(self, shop):
+        with self.lock:
+            self.in_flight[shop] += 1
+            self.max_in_flight[shop] = max(self.max_in_flight[shop], self.in_flight[shop])
+
+    def request_finished(self, shop, endpoint, status, seconds):
+        with self.lock:
+            self.in_flight[shop] -= 1
+            self.requests[shop, endpoint, str(status)] += 1
+            counts = self.latency.setdefault((shop, endpoint), [0] * (len(self.buckets) + 1))
+            counts[bisect.bisect_left(self.buckets, seconds)] += 1
+            self.latency_sum[shop, endpoint] += seconds
+
+    def add_throttle_wait(self, shop, bucket, seconds):
+        with self.lock:
+            self.throttle_wait[shop, bucket] += seconds
+
+    def add_retry(self, shop, reason):
+        with self.lock:
+            self.retries[shop, reason] += 1
+
+    def add_drafts(self, shop, outcome, count=1):
+        if count:
+            with self.lock:
+                self.drafts[shop, outcome] += count
+
+    def render(self):
+        """
+        Returns:
+            str: All metrics in the Prometheus text exposition format.
+        """
+        lines = []
+
+        def family(name, kind, help_text, samples, label_names):
+            lines.append(f"# HELP {name} {help_text}")
+            lines.append(f"# TYPE {name} {kind}")
+            for labels, value in sorted(samples.items()):
+                labels = labels if isinstance(labels, tuple) else (labels,)
+                lines.append(f"{name}{_prometheus_labels(zip(label_names, labels))} {value:g}")
+
+        with self.lock:
+            family("draft_completion_requests_total", "counter", "HTTP requests by endpoint and status.",
+                   self.requests, ("shop", "endpoint", "status"))
+            name = "draft_completion_request_seconds"
+            lines.append(f"# HELP {name} HTTP request latency.")
+            lines.append(f"# TYPE {name} histogram")
+            for (shop, endpoint), counts in sorted(self.latency.items()):
+                cumulative = 0
+                for bound, count in zip(self.buckets + ("+Inf",), counts):
+                    cumulative += count
+                    le = bound if isinstance(bound, str) else f"{bound:g}"
+                    labels = _prometheus_labels([("shop", shop), ("endpoint", endpoint), ("le", le)])
+                    lines.append(f"{name}_bucket{labels} {cumulative}")
+                labels = _prometheus_labels([("shop", shop), ("endpoint", endpoint)])
+                lines.append(f"{name}_sum{labels} {self.latency_sum[shop, endpoint]:g}")
+                lines.append(f"{name}_count{labels} {cumulative}")
+            family("draft_completion_throttle_wait_seconds_total", "counter",
+                   "Seconds spent waiting on rate limit buckets and retry backoff.",
+                   self.throttle_wait, ("shop", "bucket"))
+            family("draft_completion_retries_total", "counter", "Retried requests by reason.",
+                   self.retries, ("shop", "reason"))
+            family("draft_completion_drafts_total", "counter", "Draft orders by outcome.",
+                   self.drafts, ("shop", "outcome"))
+            family("draft_completion_in_flight_requests", "gauge", "HTTP requests currently in flight.",
+                   self.in_flight, ("shop",))
+            family("draft_completion_max_in_flight_requests", "gauge", "Most HTTP requests in flight at once.",
+                   self.max_in_flight, ("shop",))
+        return "\n".join(lines) + "\n"
+
+def _prometheus_labels(pairs):
+    # {name="value",...} with backslashes, quotes and newlines escaped
+    labels = []
+    for name, value in pairs:
+        value = str(value or "").replace("\\", "\\\\").replace('"', '\\"').replace("\n", "\\n")
+        labels.append(f'{name}="{value}"')
+    return "{" + ",".join(labels) + "}"
+
+class JsonLog:
+    """
+    Append-only structured log, one JSON object per line with a UTC timestamp and an event name.
+
+    Thread-safe.
+    """
+
+    def __init__(self, path):
+        self.lock = threading.Lock()
+        self.file = open(path, "a", encoding="utf-8")
+
+    def write(self, event, **fields):
+        record = {"ts": datetime.now(timezone.utc).isoformat(timespec="milliseconds"), "event": event, **fields}
+        line = json.dumps(record, default=str)
+        with self.lock:
+            self.file.write(line + "\n")
+            self.file.flush()
+
+    def close(self):
+        with self.lock:
+            self.file.close()
+
+# Metrics of the whole run, and the JSON log (opened by the entry point if LOG_PATH is set)
+metrics = Metrics()
+event_log = None
+
+def log_event(event, **fields):
+    """
+    Write an event to the JSON log, if one is open.
+    """
+    if event_log:
+        event_log.write(event, **fields)
+
+def traced_request(shop, endpoint, request):
+    """
+    Make one HTTP request and record its status, latency and concurrency in the metrics and the JSON log.
+
+    Args:
+        shop (str): Shopify store domain.
+        endpoint (str): Endpoint label, e.g. "draft_orders" or "graphql:draftOrderCompleteBatch".
+        request (callable): Sends the request and returns a requests.Response.
+
+    Returns:
+        requests.Response: Response of request.
+    """
+    metrics.request_started(shop)
+    started = time.perf_counter()
+    status = "error"
+    try:
+        resp = request()
+        status = resp.status_code
+        return resp
+    except requests.exceptions.RequestException as e:
+        status = type(e).__name__
+        raise
+    finally:
+        seconds = time.perf_counter() - started
+        metrics.request_finished(shop, endpoint, status, seconds)
+        log_event("request", shop=shop, endpoint=endpoint, status=status, seconds=round(seconds, 4),
+                  thread=threading.current_thread().name)
+
+def serve_metrics(port, host="127.0.0.1"):
+    """
+    Serve the metrics at http://host:port/metrics on a background thread.
+
+    Returns:
+        ThreadingHTTPServer: The running server, shut it down when the run ends.
+    """
+    class MetricsHandler(BaseHTTPRequestHandler):
+        def do_GET(self):
+            if self.path.split("?", 1)[0] != "/metrics":
+                self.send_error(404)
+                return
+            body = metrics.render().encode("utf-8")
+            self.send_response(200)
+            self.send_header("Content-Type", "text/plain; version=0.0.4; charset=utf-8")
+            self.send_header("Content-Length", str(len(body)))
+            self.end_headers()
+            self.wfile.write(body)
+
+        def log_message(self, format, *args):
+            pass
+
+    server = ThreadingHTTPServer((host, port), MetricsHandler)
+    server.daemon_threads = True
+    threading.Thread(target=server.serve_forever, daemon=True).start()
+    return server
+
+def write_metrics(path):
+    """
+    Write the metrics to a file in the Prometheus text format (e.g. for node_exporter's textfile collector).
+
+    The file is replaced atomically, so a scraper never reads it half written.
+    """
+    tmp_path = f"{path}.tmp"
+    with open(tmp_path, "w", encoding="utf-8") as f:
+        f.write(metrics.render())
+    os.replace(tmp_path, path)
+
+# ---------------------- Rate Limiting ----------------------
+
+class RateLimiter:
+    """
+    Paces requests to one Shopify store from its own rate limit reports instead of a fixed sleep.
+
+    GraphQL calls draw from a cost bucket. Every response reports the bucket state in
+    extensions.cost.throttleStatus (maximumAvailable, currentlyAvailable, restoreRate);
+    between responses the bucket is estimated to refill at restoreRate, and the cost of
+    requests still in flight is reserved so concurrent workers don't overdraw it.
+
+    REST calls use a leaky bucket reported in the X-Shopify-Shop-Api-Call-Limit header
+    (e.g. "32/40") that leaks rest_leak_rate calls per second.
+
+    Waits are added to the store's throttle wait metrics.
+    All methods are thread-safe.
+    """
+
+    def __init__(self, graphql_max=1000.0, graphql_restore_rate=50.0, rest_limit=40, rest_leak_rate=2.0, shop=None):
+        self.lock = threading.Lock()
+        self.shop = shop
+        # GraphQL cost bucket
+        self.graphql_max = graphql_max
+        self.graphql_restore_rate = graphql_restore_rate
+        self.graphql_available = graphql_max
+        self.graphql_reserved = 0.0
+        self.graphql_updated = time.monotonic()
+        # REST leaky bucket
+        self.rest_limit = rest_limit
+        self.rest_leak_rate = rest_leak_rate
+        self.rest_used = 0.0
+        self.rest_in_flight = 0
+        self.rest_updated = time.monotonic()
+        # Seconds spent waiting on either bucket
+        self.throttle_wait = 0.0
+
+    def _graphql_estimate(self, now):
+        elapsed = now - self.graphql_updated
+        return min(self.graphql_max, self.graphql_available + elapsed * self.graphql_restore_rate)
+
+    def acquire_graphql(self, cost):
+        """
+        Block until the GraphQL bucket has room for a request of the given cost, then reserve it.
+
+        Args:
+            cost (float): Requested query cost.
+        """
+        cost = min(cost, self.graphql_max)
+        while True:
+            with self.lock:
+                now = time.monotonic()
+                available = self._graphql_estimate(now) - self.graphql_reserved
+                if available >= cost:
+                    self.graphql_reserved += cost
+                    return
+                wait = (cost - available) / self.graphql_restore_rate
+                self.throttle_wait += wait
+            metrics.add_throttle_wait(self.shop, "graphql", wait)
+            time.sleep(wait)
+
+    def release_graphql(self, cost, throttle_status=None):
+        """
+        Release a reservation made by acquire_graphql and take over the bucket state Shopify reported.
+
+        Args:
+            cost (float): Cost that was reserved.
+            throttle_status (dict, optional): extensions.cost.throttleStatus of the response.
+        """
+        with self.lock:
+            self.graphql_reserved = max(0.0, self.graphql_reserved - min(cost, self.graphql_max))
+            if throttle_status:
+                self.graphql_max = float(throttle_status.get("maximumAvailable", self.graphql_max))
+                self.graphql_restore_rate = float(throttle_status.get("restoreRate", self.graphql_restore_rate))
+                self.graphql_available = float(throttle_status.get("currentlyAvailable", self.graphql_available))
+                self.graphql_updated = time.monotonic()
+
+    def _rest_estimate(self, now):
+        return max(0.0, self.rest_used - (now - self.rest_updated) * self.rest_leak_rate)
+
+    def acquire_rest(self):
+        """
+        Block until the REST bucket has room for one more call, then reserve it.
+        """
+        while True:
+            with self.lock:
+                now = time.monotonic()
+                used = self._rest_estimate(now) + self.rest_in_flight
+                if used + 1 <= self.rest_limit - 1:     # keep one call of headroom
+                    self.rest_in_flight += 1
+                    return
+                wait = (used + 2 - self.rest_limit) / self.rest_leak_rate
+                self.throttle_wait += wait
+            metrics.add_throttle_wait(self.shop, "rest", wait)
+            time.sleep(wait)
+
+    def release_rest(self, call_limit_header=None):
+        """
+        Release a reservation made by acquire_rest and take over the bucket state Shopify reported.
+
+        Args:
+            call_limit_header (str, optional): X-Shopify-Shop-Api-Call-Limit header, e.g. "32/40".
+        """
+        with self.lock:
+            self.rest_in_flight = max(0, self.rest_in_flight - 1)
+            if call_limit_header and "/" in call_limit_header:
+                used, limit = call_limit_header.split("/", 1)
+                try:
+                    self.rest_used = float(used)
+                    self.rest_limit = int(limit)
+                    self.rest_updated = time.monotonic()
+                except ValueError:
+                    pass
+
+    def wait(self, seconds):
+        """
+        Sleep for a server-requested backoff (e.g. Retry-After) and count it as throttle time.
+        """
+        with self.lock:
+            self.throttle_wait += seconds
+        metrics.add_throttle_wait(self.shop, "retry", seconds)
+        time.sleep(seconds)
+
+class BatchSizer:
+    """
+    Picks how many draftOrderComplete mutations to put into one GraphQL document.
+
+    The cost of one mutation is learned from the costs Shopify reports for each batch.
+    A batch may use at most 1/MAX_IN_FLIGHT of the cost bucket (so all in-flight
+    batches fit into it together), MAX_QUERY_COST, and MAX_BATCH_SIZE mutations.
+
+    Thread-safe.
+    """
+
+    def __init__(self, limiter, max_batch_size=None, in_flight=None):
+        self.lock = threading.Lock()
+        self.limiter = limiter
+        self.max_batch_size = max(1, max_batch_size or MAX_BATCH_SIZE)
+        self.in_flight = max(1, in_flight or MAX_IN_FLIGHT)
+        self.cost_per_draft = float(DEFAULT_MUTATION_COST)
+
+    def size(self):
+        """
+        Returns:
+            int: Number of drafts for the next batch.
+        """
+        with self.lock:
+            budget = min(MAX_QUERY_COST, self.limiter.graphql_max / self.in_flight)
+            return max(1, min(self.max_batch_size, int(budget // self.cost_per_draft)))
+
+    def cost(self, batch_len):
+        """
+        Returns:
+            float: Expected query cost of a batch of batch_len drafts.
+        """
+        with self.lock:
+            return self.cost_per_draft * batch_len
+
+    def observe(self, batch_len, cost):
+        """
+        Learn from the extensions.cost Shopify reported for a batch of batch_len drafts.
+        """
+        reported = (cost or {}).get("requestedQueryCost")
+        if not reported or not batch_len:
+            return
+        with self.lock:
+            self.cost_per_draft = float(reported) / batch_len
+
+# ---------------------- Retry Policy ----------------------
+
+class RetryPolicy:
+    """
+    Retries failed requests with exponential backoff and jitter, and counts the retries.
+
+    Failures are classified by whether repeating the request is safe:
+      - throttled (429, GraphQL THROTTLED) and connect timeouts never reached Shopify,
+        so they are always retried;
+      - read timeouts, dropped connections and 5xx may have been processed, so they
+        are only retried for idempotent requests.
+    Other errors (4xx, SSL errors, bad responses) are returned or raised right away.
+
+    One policy is shared by all requests to a store, its stats feed the final report
+    and the store's retry metrics.
+    Thread-safe.
+    """
+
+    def __init__(self, attempts=None, base_delay=None, max_delay=None, shop=None):
+        # None picks up the RETRY_* settings
+        self.attempts = max(1, attempts or RETRY_ATTEMPTS)
+        self.base_delay = RETRY_BASE_DELAY if base_delay is None else base_delay
+        self.max_delay = RETRY_MAX_DELAY if max_delay is None else max_delay
+        self.shop = shop
+        self.lock = threading.Lock()
+        self.stats = Counter()      # retries by reason, plus "gave_up"
+
+    def backoff(self, attempt, retry_after=None):
+        """
+        Returns:
+            float: Seconds to wait before the next attempt.
+        """
+        delay = random.uniform(0, min(self.max_delay, self.base_delay * 2 ** (attempt - 1)))
+        return max(delay, retry_after or 0.0)
+
+    @staticmethod
+    def classify_error(error, idempotent):
+        """
+        Returns:
+            str or None: Retry reason for a request exception, None if it shouldn't be retried.
+        """
+        if isinstance(error, requests.exceptions.SSLError):
+            return None
+        if isinstance(error, requests.exceptions.ConnectTimeout):
+            return "connect_timeout"
+        if isinstance(error, requests.exceptions.ReadTimeout):
+            return "read_timeout" if idempotent else None
+        if isinstance(error, requests.exceptions.ConnectionError):
+            return "connection_error" if idempotent else None
+        return None
+
+    @staticmethod
+    def classify_response(resp, idempotent):
+        """
+        Returns:
+            str or None: Retry reason for a response, None if it shouldn't be retried.
+        """
+        if resp.status_code == 429:
+            return "throttled"
+        if resp.status_code >= 500:
+            return f"http_{resp.status_code}" if idempotent else None
+        return None
+
+    def _count(self, reason):
+        with self.lock:
+            self.stats[reason] += 1
+        metrics.add_retry(self.shop, reason)
+
+    def run(self, send, idempotent, limiter=None, what="request", check=None):
+        """
+        Call send until it succeeds, fails for good, or the attempts run out.
+
+        Args:
+            send (callable): Makes one attempt and returns a requests.Response.
+            idempotent (bool): The request is safe to repeat even if it may have been processed.
+            limiter (RateLimiter, optional): Rate limiter to count the waits against.
+            what (str): Description of the request for log messages.
+            check (callable, optional): Extra retry reason for a response (e.g. GraphQL THROTTLED).
+
+        Returns:
+            requests.Response: Last response.
+
+        Raises:
+            requests.exceptions.RequestException: Last error, if it wasn't retryable or retries ran out.
+        """
+        attempt = 0
+        while True:
+            attempt += 1
+            retry_after = None
+            try:
+                resp = send()
+            except requests.exceptions.RequestException as e:
+                reason = self.classify_error(e, idempotent)
+                if reason is None:
+                    raise
+                if attempt >= self.attempts:
+                    self._count("gave_up")
+                    raise
+            else:
+                reason = self.classify_response(resp, idempotent) or (check(resp) if check else None)
+                if reason is None:
+                    return resp
+                if attempt >= self.attempts:
+                    self._count("gave_up")
+                    return resp
+                if resp.status_code in (429, 503) and "Retry-After" in resp.headers:
+                    retry_after = retry_after_seconds(resp)
+            self._count(reason)
+            wait = self.backoff(attempt, retry_after)
+            print(f"{what} failed ({reason}), retry {attempt}/{self.attempts - 1} in {wait:.1f}s")
+            log_event("retry", shop=self.shop, what=what, reason=reason, attempt=attempt, wait=round(wait, 3))
+            if limiter:
+                limiter.wait(wait)
+            else:
+                time.sleep(wait)
+
+# ---------------------- Draft Filtering ----------------------
+
+def _split_tags(tags):
+    # "a, B,c" -> {"a", "b", "c"}; tags compare case-insensitively like in the Shopify admin
+    if isinstance(tags, str):
+        tags = tags.split(",")
+    return {t.strip().lower() for t in tags or () if t.strip()}
+
+def _parse_time(value):
+    if not value:
+        return None
+    try:
+        return datetime.fromisoformat(value.replace("Z", "+00:00"))
+    except ValueError:
+        return None
+
+class DraftFilter:
+    """
+    Decides which open draft orders get completed.
+
+    What can be expressed server-side is pushed into the listing request: the REST
+    listing only downloads the fields the rules need, the bulk export gets a search
+    query with the tag, customer and age rules so skipped drafts aren't exported at all.
+    Every rule is still checked client-side on each streamed draft before a mutation is
+    sent, and the skipped drafts are counted by reason.
+
+    Args:
+        skip_tags (str or list): Drafts with any of these tags are skipped.
+        include_tags (str or list): If set, only drafts with at least one of these tags are completed.
+        customer_ids (list): If set, only drafts of these customers are completed.
+        min_age (timedelta, optional): Skip drafts created less than this long ago.
+        max_age (timedelta, optional): Skip drafts created more than this long ago.
+        now (callable): Returns the current time, for testing.
+    """
+
+    # Fields of draft_orders.json the rules look at
+    REST_FIELDS = "id,name,tags,customer,created_at"
+
+    def __init__(self, skip_tags=(), include_tags=(), customer_ids=(), min_age=None, max_age=None,
+                 now=lambda: datetime.now(timezone.utc)):
+        self.skip_tags = _split_tags(skip_tags)
+        self.include_tags = _split_tags(include_tags)
+        self.customer_ids = {int(c) for c in customer_ids or ()}
+        self.min_age = min_age
+        self.max_age = max_age
+        self.now = now
+        self.lock = threading.Lock()
+        self.stats = Counter()      # skipped drafts by reason
+
+    @classmethod
+    def from_config(cls):
+        """
+        Build the filter from the configuration section.
+        """
+        return cls(skip_tags=skip_tags, include_tags=INCLUDE_TAGS, customer_ids=CUSTOMER_IDS,
+                   min_age=timedelta(hours=MIN_DRAFT_AGE_HOURS) if MIN_DRAFT_AGE_HOURS else None,
+                   max_age=timedelta(days=MAX_DRAFT_AGE_DAYS) if MAX_DRAFT_AGE_DAYS else None)
+
+    def rest_params(self):
+        """
+        Returns:
+            dict: Extra draft_orders.json parameters (only fields can be combined with page_info).
+        """
+        return {"fields": self.REST_FIELDS}
+
+    def search_query(self):
+        """
+        Returns:
+            str: Shopify search syntax for the draftOrders query of a bulk export.
+        """
+        terms = ["status:open"]
+        terms += [f"-tag:{json.dumps(tag)}" for tag in sorted(self.skip_tags)]
+        if self.include_tags:
+            terms.append("(" + " OR ".join(f"tag:{json.dumps(tag)}" for tag in sorted(self.include_tags)) + ")")
+        if self.customer_ids:
+            terms.append("(" + " OR ".join(f"customer_id:{c}" for c in sorted(self.customer_ids)) + ")")
+        now = self.now()
+        if self.min_age:
+            terms.append(f"created_at:<={(now - self.min_age).strftime('%Y-%m-%dT%H:%M:%SZ')}")
+        if self.max_age:
+            terms.append(f"created_at:>={(now - self.max_age).strftime('%Y-%m-%dT%H:%M:%SZ')}")
+        return " ".join(terms)
+
+    def skip_reason(self, draft):
+        """
+        Returns:
+            str or None: Why the draft is skipped, None if it should be completed.
+        """
+        tags = _split_tags(draft.get("tags"))
+        if tags & self.skip_tags:
+            return "skip_tag"
+        if self.include_tags and not tags & self.include_tags:
+            return "missing_tag"
+        if self.customer_ids:
+            customer = draft.get("customer") or {}
+            if customer.get("id") not in self.customer_ids:
+                return "customer"
+        if self.min_age or self.max_age:
+            created = _parse_time(draft.get("created_at"))
+            if created is None:
+                return "age"
+            age = self.now() - created
+            if (self.min_age and age < self.min_age) or (self.max_age and age > self.max_age):
+                return "age"
+        return None
+
+    def select(self, drafts):
+        """
+        Keep the drafts that should be completed and count the others.
+
+        Args:
+            drafts (list): Draft orders of one page.
+
+        Returns:
+            list: Drafts to complete.
+        """
+        selected = []
+        skipped = Counter()
+        for draft in drafts:
+            reason = self.skip_reason(draft)
+            if reason:
+                skipped[reason] += 1
+            else:
+                selected.append(draft)
+        if skipped:
+            with self.lock:
+                self.stats.update(skipped)
+        return selected
+
+# ---------------------- Checkpoint Journal ----------------------
+
+class CompletionJournal:
+    """
+    Append-only JSONL journal of a completion run, so an interrupted run can resume.
+
+    Three kinds of records are written:
+      {"type": "draft", "shop", "id", "order"}     outcome of one draft (order is None if it failed)
+      {"type": "cursor", "shop", "backend", "page_info"}
+                                                 every draft before this cursor has an outcome
+      {"type": "done", "shop"}                     the store was processed to the end
+
+    On load the journal is replayed: for every store that isn't done it remembers the
+    completed drafts and the last cursor, and a restarted run skips those drafts and
+    continues from that cursor. A store that finished starts over on the next run.
+
+    Args:
+        path (str): Journal file, created if missing.
+    """
+
+    def __init__(self, path):
+        self.path = path
+        self.lock = threading.Lock()
+        self.completed = {}     # shop -> set of completed draft ids
+        self.cursors = {}       # shop -> (backend, page_info)
+        if os.path.exists(path):
+            self._replay()
+        self.file = open(path, "a", encoding="utf-8")
+
+    def _replay(self):
+        with open(self.path, encoding="utf-8") as f:
+            for line in f:
+                try:
+                    record = json.loads(line)
+                except ValueError:
+                    # A torn last line from a crash mid-write
+                    continue
+                shop = record.get("shop")
+                kind = record.get("type")
+                if kind == "draft" and record.get("order"):
+                    self.completed.setdefault(shop, set()).add(record["id"])
+                elif kind == "cursor":
+                    self.cursors[shop] = (record.get("backend"), record.get("page_info"))
+                elif kind == "done":
+                    self.completed.pop(shop, None)
+                    self.cursors.pop(shop, None)
+
+    def _write(self, record):
+        with self.lock:
+            self.file.write(json.dumps(record) + "\n")
+            self.file.flush()
+
+    def resume(self, shop, backend):
+        """
+        Returns:
+            tuple: (set of draft ids already completed, page_info to continue from or None)
+        """
+        with self.lock:
+            completed = set(self.completed.get(shop, ()))
+            cursor_backend, page_info = self.cursors.get(shop, (None, None))
+        return completed, page_info if cursor_backend == backend else None
+
+    def record_drafts(self, shop, results):
+        """
+        Record the outcome of drafts.
+
+        Args:
+            shop (str): Shopify store domain.
+            results (list): (draft_id, order data or None) pairs.
+        """
+        with self.lock:
+            for draft_id, order in results:
+                self.file.write(json.dumps({"type": "draft", "shop": shop, "id": draft_id,
+                                            "order": (order or {}).get("id")}) + "\n")
+            self.file.flush()
+
+    def commit_cursor(self, shop, backend, page_info):
+        """
+        Record that every draft before page_info has an outcome.
+        """
+        self._write({"type": "cursor", "shop": shop, "backend": backend, "page_info": page_info})
+
+    def finish(self, shop):
+        """
+        Record that a store was processed to the end.
+        """
+        self._write({"type": "done", "shop": shop})
+
+    def close(self):
+        with self.lock:
+            self.file.close()
+
+# ---------------------- HTTP Sessions ----------------------
+
+class Http2Adapter(requests.adapters.BaseAdapter):
+    """
+    Transport adapter that sends a session's requests through an httpx client speaking HTTP/2.
+
+    Requests in flight to a store are multiplexed over one connection instead of one
+    connection each. httpx responses and errors are turned into their requests
+    equivalents, so the rest of the tool works unchanged.
+
+    Thread-safe.
+    """
+
+    def __init__(self, max_connections):
+        super().__init__()
+        self.lock = threading.Lock()
+        self.max_connections = max_connections
+        self.clients = {}               # verify setting -> httpx.Client
+        self.requests_sent = 0
+        self.connections_opened = 0
+
+    def _client(self, verify):
+        with self.lock:
+            client = self.clients.get(verify)
+            if client is None:
+                keepalive = self.max_connections if KEEP_ALIVE else 0
+                limits = httpx.Limits(max_connections=self.max_connections, max_keepalive_connections=keepalive)
+                context = ssl.create_default_context(cafile=verify) if isinstance(verify, str) else verify
+                client = self.clients[verify] = httpx.Client(http2=True, verify=context, limits=limits)
+            return client
+
+    def _trace(self, event, info):
+        # httpcore trace hook, counts the connections it opens
+        if event == "connection.connect_tcp.complete":
+            with self.lock:
+                self.connections_opened += 1
+
+    def send(self, request, stream=False, timeout=None, verify=True, cert=None, proxies=None):
+        connect_timeout, read_timeout = timeout if isinstance(timeout, tuple) else (timeout, timeout)
+        # HTTP/2 forbids connection-specific headers, keep-alive is handled by the client's limits
+        headers = {k: v for k, v in request.headers.items() if k.lower() not in ("connection", "keep-alive")}
+        try:
+            resp = self._client(verify).request(request.method, request.url, headers=headers,
+                                                content=request.body,
+                                                timeout=httpx.Timeout(read_timeout, connect=connect_timeout),
+                                                extensions={"trace": self._trace})
+        except httpx.ConnectTimeout as e:
+            raise requests.exceptions.ConnectTimeout(e, request=request)
+        except httpx.TimeoutException as e:
+            raise requests.exceptions.ReadTimeout(e, request=request)
+        except httpx.ConnectError as e:
+            if isinstance(e.__context__, ssl.SSLError) or "CERTIFICATE_VERIFY_FAILED" in str(e):
+                raise requests.exceptions.SSLError(e, request=request)
+            raise requests.exceptions.ConnectionError(e, request=request)
+        except httpx.TransportError as e:
+            raise requests.exceptions.ConnectionError(e, request=request)
+        with self.lock:
+            self.requests_sent += 1
+
+        response = requests.Response()
+        response.status_code = resp.status_code
+        response.reason = resp.reason_phrase
+        response.headers = requests.structures.CaseInsensitiveDict(resp.headers)
+        response.encoding = requests.utils.get_encoding_from_headers(response.headers)
+        response.url = request.url
+        response.request = request
+        response.connection = self
+        response.elapsed = resp.elapsed
+        # httpx already read and decoded the body
+        response._content = resp.content
+        response._content_consumed = True
+        return response
+
+    def close(self):
+        with self.lock:
+            for client in self.clients.values():
+                client.close()
+            self.clients.clear()
+
+class CountingHTTPAdapter(requests.adapters.HTTPAdapter):
+    """
+    HTTPAdapter that counts the requests it sends and the connections it opens for them.
+
+    urllib3's own pool counters miss reconnects of a pooled connection the server had
+    closed, so connections are counted where the socket is connected.
+    """
+
+    def __init__(self, *args, **kwargs):
+        self.lock = threading.Lock()
+        self.requests_sent = 0
+        self.connections_opened = 0
+        super().__init__(*args, **kwargs)
+
+    def _count_connection(self):
+        with self.lock:
+            self.connections_opened += 1
+
+    def init_poolmanager(self, *args, **kwargs):
+        super().init_poolmanager(*args, **kwargs)
+        adapter = self
+        pool_classes = {}
+        for scheme, pool_cls in self.poolmanager.pool_classes_by_scheme.items():
+            class CountingConnection(pool_cls.ConnectionCls):
+                def connect(self):
+                    super().connect()
+                    adapter._count_connection()
+            pool_classes[scheme] = type(pool_cls.__name__, (pool_cls,), {"ConnectionCls": CountingConnection})
+        self.poolmanager.pool_classes_by_scheme = pool_classes
+
+    def send(self, request, *args, **kwargs):
+        resp = super().send(request, *args, **kwargs)
+        with self.lock:
+            self.requests_sent += 1
+        return resp
+
+def make_session(api_token, pool_size=None):
+    """
+    Create the session all requests to one store go through.
+
+    The connection pool is sized to the store's concurrency, so every worker and the
+    listing thread can keep a connection open instead of reconnecting per request.
+    With HTTP2 (and httpx installed) requests go through an Http2Adapter instead.
+
+    Args:
+        api_token (str): Admin API token of the store.
+        pool_size (int, optional): Connections to keep open, POOL_SIZE (or MAX_IN_FLIGHT + 1) if None.
+
+    Returns:
+        requests.Session: Authenticated session.
+    """
+    pool_size = pool_size or POOL_SIZE or MAX_IN_FLIGHT + 1
+    session = requests.Session()
+    if HTTP2 and httpx is not None:
+        adapter = Http2Adapter(pool_size)
+    else:
+        if HTTP2:
+            print("HTTP2 is enabled but httpx is not installed, using HTTP/1.1")
+        # One pool per scheme and host; pool_block makes extra threads wait for a connection
+        adapter = CountingHTTPAdapter(pool_connections=1, pool_maxsize=pool_size, pool_block=True)
+    session.mount("https://", adapter)
+    session.mount("http://", adapter)
+    # Use certifi bundle for SSL verification if enabled
+    if SSL_VERIFY:
+        session.verify = certifi.where()
+    else:
+        session.verify = False
+        print("SSL verification is disabled")
+    # Set up headers for API requests
+    session.headers.update({
+        "X-Shopify-Access-Token": api_token,
+        "Content-Type": "application/json",
+        "Accept": "application/json",
+        "Connection": "keep-alive" if KEEP_ALIVE else "close",
+    })
+    return session
+
+def connection_stats(session):
+    """
+    Count the requests a session sent and the connections it opened for them.
+
+    Returns:
+        tuple: (requests sent, connections opened)
+    """
+    adapters = [a for a in set(session.adapters.values()) if isinstance(a, (CountingHTTPAdapter, Http2Adapter))]
+    return sum(a.requests_sent for a in adapters), sum(a.connections_opened for a in adapters)
+
 # ---------------------- Helper Functions ----------------------
 
-def fetch_open_draft_orders(session, shop, api_version, page_info=None):
+def add_to_totals(open_drafts=0, completed=0):
+    """
+    Add to the global counters. Safe to call from several stores' threads at once.
+    """
+    global total_open_drafts, total_completed
+    with totals_lock:
+        total_open_drafts += open_drafts
+        total_completed += completed
+
+def shop_url(shop, api_version, path):
+    """
+    Build an Admin API URL for a store.
+
+    Args:
+        shop (str): Shopify store domain.
+        api_version (str): Shopify API version.
+        path (str): Path below the versioned API root, e.g. "graphql.json".
+
+    Returns:
+        str: Full URL.
+    """
+    return f"{SHOPIFY_SCHEME}://{shop}/admin/api/{api_version}/{path}"
+
+def retry_after_seconds(resp, default=2.0):
+    """
+    Read the Retry-After header of a throttled response.
+
+    Returns:
+        float: Seconds to wait.
+    """
+    try:
+        return float(resp.headers.get("Retry-After", default))
+    except (TypeError, ValueError):
+        return default
+
+def _get_draft_page(session, shop, url, params, limiter, retry):
+    # GET one page, waiting on the REST bucket; listing is idempotent so every transient error is retried
+    def send():
+        if limiter:
+            limiter.acquire_rest()
+        resp = None
+        try:
+            resp = traced_request(shop, "draft_orders",
+                                  lambda: session.get(url, params=params, timeout=REQUEST_TIMEOUT))
+            return resp
+        finally:
+            if limiter:
+                limiter.release_rest(resp.headers.get("X-Shopify-Shop-Api-Call-Limit") if resp is not None else None)
+    return retry.run(send, idempotent=True, limiter=limiter, what=f"GET {url}")
+
+def fetch_open_draft_orders(session, shop, api_version, page_info=None, limiter=None, retry=None, draft_filter=None,
+                            ssl_fallback=True):
     """
     Fetch a single page of open draft orders from a Shopify store.
 
+    Transient errors are retried by the retry policy. Anything left after that is raised,
+    so the store's run stops and can be resumed from the journal.
+
     Args:
         session (requests.Session): Authenticated session for requests.
         shop (str): Shopify store domain.
         api_version (str): Shopify API version.
         page_info (str, optional): Token for pagination. None for first page.
+        limiter (RateLimiter, optional): Rate limiter of the store.
+        retry (RetryPolicy, optional): Retry policy of the store.
+        draft_filter (DraftFilter, optional): Filter whose listing parameters are sent along.
+        ssl_fallback (bool): On an SSL error, turn off the session's SSL verification and try again.
+            Only safe before any other request is using the session.
 
     Returns:
         tuple: (list of draft orders, next page_info token or None)
+
+    Raises:
+        requests.exceptions.RequestException: If the page can't be fetched.
     """
-    url = f"https://{shop}/admin/api/{api_version}/draft_orders.json"
-    params = {"status": "open", "limit": PER_PAGE}
-    # Add pagination token if present
+    retry = retry or RetryPolicy()
+    url = shop_url(shop, api_version, "draft_orders.json")
+    # Add pagination token if present (Shopify only accepts limit and fields next to it)
     if page_info:
-        params["page_info"] = page_info
+        params = {"limit": PER_PAGE, "page_info": page_info}
+    else:
+        params = {"status": "open", "limit": PER_PAGE}
+    if draft_filter:
+        params.update(draft_filter.rest_params())
     if DEBUG_LOG_URLS:
         print(f"GET {url} params={params}")
 
     # Execute HTTP GET request with error handling
     try:
-        resp = session.get(url, params=params, timeout=REQUEST_TIMEOUT)
+        resp = _get_draft_page(session, shop, url, params, limiter, retry)
         resp.raise_for_status()
     except requests.exceptions.HTTPError:
         # Print debug info on HTTP error
         print(f"HTTP error {resp.status_code}: {resp.text}")
         print("Request headers:", resp.request.headers)
-        exit(1)
+        raise
     except requests.exceptions.SSLError as ssl_err:
         # On SSL error, retry with SSL verification disabled if not already
-        if SSL_VERIFY:
+        if ssl_fallback and SSL_VERIFY and session.verify is not False:
             print(f"SSL error fetching drafts: {ssl_err}\n Retrying with SSL_VERIFY=false...")
             session.verify = False
             try:
-                resp = session.get(url, params=params, timeout=REQUEST_TIMEOUT)
+                resp = _get_draft_page(session, shop, url, params, limiter, retry)
                 resp.raise_for_status()
             except Exception as e:
                 print(f"Retry failed: {e}")
-                exit(1)
+                raise
         else:
             print(f"SSL error fetching drafts even with verification disabled: {ssl_err}")
-            exit(1)
+            raise
     except requests.exceptions.ConnectTimeout:
         print(f"Connection timed out when connecting to {url}")
-        exit(1)
+        raise
     except Exception as e:
         print(f"Error fetching drafts: {e}")
-        exit(1)
+        raise
 
     data = resp.json()
 
@@ -103,32 +1134,245 @@ def fetch_open_draft_orders(session, shop, api_version, page_info=None):
     next_info = None
     for part in link_header.split(","):
         if 'rel="next"' in part:
-            import re
-            m = re.search(r"page_info=([^&]+)", part)
+            m = re.search(r"page_info=([^&>]+)", part)
             if m:
                 next_info = m.group(1)
     return data.get("draft_orders", []), next_info
 
-def complete_draft_order(session, shop, api_version, draft_id):
+def iter_draft_pages(session, shop, api_version, limiter=None, page_info=None, retry=None, draft_filter=None):
     """
-    Complete a draft order using Shopify's GraphQL API.
+    Yield every page of open draft orders, following the Link header cursors.
 
     Args:
         session (requests.Session): Authenticated session for requests.
         shop (str): Shopify store domain.
         api_version (str): Shopify API version.
-        draft_id (int): ID of the draft order to complete.
+        limiter (RateLimiter, optional): Rate limiter of the store.
+        page_info (str, optional): Cursor to start from. None for the first page.
+        retry (RetryPolicy, optional): Retry policy of the store.
+        draft_filter (DraftFilter, optional): Filter whose listing parameters are sent along.
+
+    Yields:
+        tuple: (draft orders of one page, cursor of the page after it or None)
+    """
+    next_page = page_info
+    first = True
+    while True:
+        # The session's SSL verification may only change before any draft order is being completed
+        drafts, next_page = fetch_open_draft_orders(session, shop, api_version, next_page, limiter, retry,
+                                                    draft_filter, ssl_fallback=first)
+        first = False
+        if not drafts:
+            return
+        yield drafts, next_page
+        if not next_page:
+            return
+
+# %(search)s is filled in with a JSON-quoted Shopify search string
+BULK_DRAFT_ORDERS_QUERY = """
+    {
+      draftOrders(query: %(search)s) {
+        edges {
+          node {
+            id
+            legacyResourceId
+            name
+            tags
+            createdAt
+            customer {
+              legacyResourceId
+            }
+          }
+        }
+      }
+    }"""
+
+BULK_OPERATION_RUN_MUTATION = """
+    mutation bulkOperationRunQuery($query: String!) {
+      bulkOperationRunQuery(query: $query) {
+        bulkOperation {
+          id
+          status
+        }
+        userErrors {
+          field
+          message
+        }
+      }
+    }"""
+
+CURRENT_BULK_OPERATION_QUERY = """
+    {
+      currentBulkOperation {
+        id
+        status
+        errorCode
+        objectCount
+        url
+      }
+    }"""
+
+def run_bulk_export(session, shop, api_version, limiter=None, retry=None, draft_filter=None):
+    """
+    Start a bulk operation exporting the open draft orders and wait until it finishes.
+
+    Args:
+        session (requests.Session): Authenticated session for requests.
+        shop (str): Shopify store domain.
+        api_version (str): Shopify API version.
+        limiter (RateLimiter, optional): Rate limiter of the store.
+        retry (RetryPolicy, optional): Retry policy of the store.
+        draft_filter (DraftFilter, optional): Filter whose rules are pushed into the export query.
 
     Returns:
-        dict or None: Order data if successful, None otherwise.
+        str or None: URL of the JSONL export, None if the store has no open drafts.
+
+    Raises:
+        RuntimeError: If the operation can't be started, fails or times out.
     """
-    graphql_url = f"https://{shop}/admin/api/{api_version}/graphql.json"
-    gid = f"gid://shopify/DraftOrder/{draft_id}"
-    mutation = """
+    search = draft_filter.search_query() if draft_filter else "status:open"
+    bulk_query = BULK_DRAFT_ORDERS_QUERY % {"search": json.dumps(search)}
+    payload = {"query": BULK_OPERATION_RUN_MUTATION, "variables": {"query": bulk_query}}
+    result = post_graphql(session, shop, api_version, payload, limiter, retry=retry)
+    run = (result.get("data") or {}).get("bulkOperationRunQuery") or {}
+    errors = result.get("errors") or run.get("userErrors")
+    if errors or not run.get("bulkOperation"):
+        raise RuntimeError(f"Could not start bulk export in {shop}: {errors}")
+    operation_id = run["bulkOperation"]["id"]
+    print(f"[{shop}] Started bulk export {operation_id}")
+
+    deadline = time.monotonic() + BULK_TIMEOUT
+    while True:
+        result = post_graphql(session, shop, api_version, {"query": CURRENT_BULK_OPERATION_QUERY}, limiter,
+                              cost=1, retry=retry, idempotent=True)
+        operation = (result.get("data") or {}).get("currentBulkOperation") or {}
+        if operation.get("id") != operation_id:
+            raise RuntimeError(f"Bulk export {operation_id} in {shop} was replaced by {operation.get('id')}")
+        status = operation.get("status")
+        if status == "COMPLETED":
+            print(f"[{shop}] Bulk export finished with {operation.get('objectCount')} draft orders")
+            return operation.get("url")
+        if status in ("FAILED", "CANCELED", "CANCELING", "EXPIRED"):
+            raise RuntimeError(f"Bulk export {operation_id} in {shop} ended with {status} ({operation.get('errorCode')})")
+        if time.monotonic() > deadline:
+            raise RuntimeError(f"Bulk export {operation_id} in {shop} did not finish within {BULK_TIMEOUT}s")
+        time.sleep(BULK_POLL_INTERVAL)
+
+def iter_bulk_draft_pages(session, shop, api_version, limiter=None, page_info=None, retry=None, draft_filter=None,
+                          page_size=None):
+    """
+    Yield pages of open draft orders from a bulk operation export.
+
+    The JSONL export is streamed line by line, so memory use doesn't grow with its size.
+    Drafts are turned into the same shape draft_orders.json returns (id, name, tags,
+    customer, created_at).
+    An export has no cursors, so page_info is ignored and None is yielded as the next
+    cursor; a resumed run relies on the journal's completed drafts instead.
+
+    Args:
+        session (requests.Session): Authenticated session for requests.
+        shop (str): Shopify store domain.
+        api_version (str): Shopify API version.
+        limiter (RateLimiter, optional): Rate limiter of the store.
+        page_info (str, optional): Unused, for the same signature as iter_draft_pages.
+        retry (RetryPolicy, optional): Retry policy of the store.
+        draft_filter (DraftFilter, optional): Filter whose rules are pushed into the export query.
+        page_size (int, optional): Drafts per yielded page, PER_PAGE if None.
+
+    Yields:
+        tuple: (draft orders of one page, None)
+    """
+    retry = retry or RetryPolicy()
+    page_size = page_size or PER_PAGE
+    url = run_bulk_export(session, shop, api_version, limiter, retry, draft_filter)
+    if not url:
+        return
+    # The export is served from a signed storage URL, don't send the store's access token there
+    def send():
+        return traced_request(shop, "bulk_download",
+                              lambda: requests.get(url, stream=True, timeout=REQUEST_TIMEOUT, verify=session.verify))
+
+    with retry.run(send, idempotent=True, what="Bulk export download") as resp:
+        resp.raise_for_status()
+        page = []
+        for line in resp.iter_lines():
+            if not line:
+                continue
+            node = json.loads(line)
+            customer = node.get("customer")
+            page.append({"id": int(node["legacyResourceId"]), "name": node.get("name"),
+                         "tags": ", ".join(node.get("tags") or []),
+                         "customer": {"id": int(customer["legacyResourceId"])} if customer else None,
+                         "created_at": node.get("createdAt")})
+            if len(page) >= page_size:
+                yield page, None
+                page = []
+        if page:
+            yield page, None
+
+# Listing backends selectable through LISTING_BACKEND
+LISTING_BACKENDS = {
+    "rest": iter_draft_pages,
+    "bulk": iter_bulk_draft_pages,
+}
+
+def prefetch(iterable, depth=None):
+    """
+    Run an iterator on a background thread, keeping up to depth items ready in a bounded queue.
+
+    Lets the next page download while the current one is being worked on. Anything the
+    iterator raises is re-raised in the consumer.
+
+    Args:
+        iterable: Items to produce, e.g. iter_draft_pages(...).
+        depth (int, optional): Most items buffered ahead of the consumer, PREFETCH_PAGES if None.
+
+    Yields:
+        Items of iterable, in order.
+    """
+    items = queue.Queue(maxsize=max(1, depth or PREFETCH_PAGES))
+    stop = threading.Event()
+    done = object()
+
+    def put(item):
+        # Give up if the consumer went away while the queue is full
+        while not stop.is_set():
+            try:
+                items.put(item, timeout=0.1)
+                return True
+            except queue.Full:
+                pass
+        return False
+
+    def produce():
+        try:
+            for item in iterable:
+                if not put((item, None)):
+                    return
+            put((done, None))
+        except BaseException as e:
+            put((done, e))
+
+    threading.Thread(target=produce, daemon=True).start()
+    try:
+        while True:
+            item, error = items.get()
+            if error is not None:
+                raise error
+            if item is done:
+                return
+            yield item
+    finally:
+        stop.set()
+
+DRAFT_ORDER_COMPLETE_MUTATION = """
     mutation draftOrderComplete($id: ID!, $paymentPending: Boolean!) {
       draftOrderComplete(id: $id, paymentPending: $paymentPending) {
         draftOrder {
           id
+          order {
+            id
+          }
         }
         userErrors {
           field
@@ -136,33 +1380,311 @@ def complete_draft_order(session, shop, api_version, draft_id):
         }
       }
     }"""
+
+def is_throttled(result):
+    """
+    Check whether a GraphQL response was rejected for exceeding the cost bucket.
+    """
+    return any((e.get("extensions") or {}).get("code") == "THROTTLED" for e in result.get("errors") or [])
+
+def graphql_operation(query):
+    """
+    Name a GraphQL document for metrics: its operation name, or its first field if it has none.
+    """
+    m = re.match(r"\s*(?:(?:query|mutation)\s+(\w+)|\{\s*(\w+))", query)
+    return (m.group(1) or m.group(2)) if m else "anonymous"
+
+def post_graphql(session, shop, api_version, payload, limiter=None, cost=DEFAULT_MUTATION_COST,
+                 retry=None, idempotent=None):
+    """
+    Send a GraphQL request, pacing it with the store's cost bucket.
+
+    The request waits until the bucket has room for its cost. THROTTLED responses, HTTP 429s
+    and other transient errors are retried by the retry policy; THROTTLED attempts first
+    wait for the bucket to refill.
+
+    Args:
+        session (requests.Session): Authenticated session for requests.
+        shop (str): Shopify store domain.
+        api_version (str): Shopify API version.
+        payload (dict): GraphQL query and variables.
+        limiter (RateLimiter, optional): Rate limiter of the store.
+        cost (float): Expected query cost.
+        retry (RetryPolicy, optional): Retry policy of the store.
+        idempotent (bool, optional): The request is safe to repeat if its response was lost.
+            None for a draftOrderComplete mutation, which follows RETRY_MUTATIONS.
+
+    Returns:
+        dict: Parsed GraphQL response.
+
+    Raises:
+        requests.exceptions.RequestException: On network or HTTP errors left after retrying.
+    """
+    retry = retry or RetryPolicy()
+    if idempotent is None:
+        idempotent = RETRY_MUTATIONS
+    graphql_url = shop_url(shop, api_version, "graphql.json")
+    endpoint = f"graphql:{graphql_operation(payload['query'])}"
+    if DEBUG_LOG_URLS:
+        print(f"POST {graphql_url} payload={payload}")
+    result = {}
+
+    def send():
+        nonlocal result
+        if limiter:
+            limiter.acquire_graphql(cost)
+        result = {}
+        try:
+            resp = traced_request(shop, endpoint,
+                                  lambda: session.post(graphql_url, json=payload, timeout=REQUEST_TIMEOUT))
+            if resp.ok:
+                result = resp.json()
+            return resp
+        finally:
+            if limiter:
+                # the bucket state the response reported makes the next acquire_graphql wait for the refill
+                limiter.release_graphql(cost, (result.get("extensions") or {}).get("cost", {}).get("throttleStatus"))
+
+    resp = retry.run(send, idempotent, limiter, what=f"POST {graphql_url}",
+                     check=lambda resp: "throttled" if is_throttled(result) else None)
+    resp.raise_for_status()
+    return result
+
+def complete_draft_order(session, shop, api_version, draft_id, limiter=None, retry=None):
+    """
+    Complete a draft order using Shopify's GraphQL API.
+
+    Args:
+        session (requests.Session): Authenticated session for requests.
+        shop (str): Shopify store domain.
+        api_version (str): Shopify API version.
+        draft_id (int): ID of the draft order to complete.
+        limiter (RateLimiter, optional): Rate limiter of the store.
+        retry (RetryPolicy, optional): Retry policy of the store.
+
+    Returns:
+        dict or None: Order data if successful, None otherwise.
+    """
+    gid = f"gid://shopify/DraftOrder/{draft_id}"
     variables = {'id': gid, 'paymentPending': PAYMENT_PENDING}
-    payload = {'query': mutation, 'variables': variables}
+    payload = {'query': DRAFT_ORDER_COMPLETE_MUTATION, 'variables': variables}
     try:
-        if DEBUG_LOG_URLS:
-            print(f"POST {graphql_url} payload={payload}")
-        resp = session.post(graphql_url, json=payload, timeout=REQUEST_TIMEOUT)
-        resp.raise_for_status()
-        result = resp.json()
+        result = post_graphql(session, shop, api_version, payload, limiter, retry=retry)
     except Exception as e:
         print(f"Network error completing draft {draft_id}: {e}")
         return None
 
     # Check for GraphQL or user errors
     errors = result.get("errors")
-    user_errors = result.get('data', {}).get('draftOrderComplete', {}).get('userErrors')
+    user_errors = (result.get('data') or {}).get('draftOrderComplete', {}).get('userErrors')
     if errors or user_errors:
         print(f"GraphQL errors completing draft order {draft_id}: {errors or user_errors}")
         return None
 
     # Extract order info from response
     try:
-      return result["data"]["draftOrderComplete"]["order"]
+      return result["data"]["draftOrderComplete"]["draftOrder"]["order"]
     except Exception as e:
       print(f"ignore: {e}")
       return None
 
-def process_drafts(shop, api_token, api_version):
+DRAFT_ORDER_STATUS_QUERY = """
+    query draftOrderStatus($ids: [ID!]!) {
+      nodes(ids: $ids) {
+        ... on DraftOrder {
+          id
+          order {
+            id
+          }
+        }
+      }
+    }"""
+
+def find_existing_orders(session, shop, api_version, draft_ids, limiter=None, retry=None):
+    """
+    Look up which draft orders already have an order.
+
+    A retried draftOrderComplete whose first response was lost fails with "already
+    completed"; this turns such drafts back into successes.
+
+    Args:
+        session (requests.Session): Authenticated session for requests.
+        shop (str): Shopify store domain.
+        api_version (str): Shopify API version.
+        draft_ids (list): IDs of the draft orders to look up.
+        limiter (RateLimiter, optional): Rate limiter of the store.
+        retry (RetryPolicy, optional): Retry policy of the store.
+
+    Returns:
+        dict: draft_id -> order data, for the drafts that have an order.
+    """
+    payload = {"query": DRAFT_ORDER_STATUS_QUERY,
+               "variables": {"ids": [f"gid://shopify/DraftOrder/{draft_id}" for draft_id in draft_ids]}}
+    try:
+        result = post_graphql(session, shop, api_version, payload, limiter, cost=1 + len(draft_ids),
+                              retry=retry, idempotent=True)
+    except Exception as e:
+        print(f"Network error looking up drafts {draft_ids[0]}..{draft_ids[-1]}: {e}")
+        return {}
+    orders = {}
+    for draft_id, node in zip(draft_ids, (result.get("data") or {}).get("nodes") or []):
+        if node and node.get("order"):
+            orders[draft_id] = node["order"]
+    return orders
+
+def build_batch_mutation(draft_ids):
+    """
+    Build one GraphQL document completing several draft orders through aliased mutations.
+
+    Args:
+        draft_ids (list): IDs of the draft orders to complete.
+
+    Returns:
+        tuple: (query, variables, list of aliases in the order of draft_ids)
+    """
+    aliases = [f"d{i}" for i in range(len(draft_ids))]
+    params = "".join(f", $id{i}: ID!" for i in range(len(draft_ids)))
+    fields = "".join(f"""
+      {alias}: draftOrderComplete(id: $id{i}, paymentPending: $paymentPending) {{
+        draftOrder {{
+          id
+          order {{
+            id
+          }}
+        }}
+        userErrors {{
+          field
+          message
+        }}
+      }}""" for i, alias in enumerate(aliases))
+    query = f"""
+    mutation draftOrderCompleteBatch($paymentPending: Boolean!{params}) {{{fields}
+    }}"""
+    variables = {"paymentPending": PAYMENT_PENDING}
+    for i, draft_id in enumerate(draft_ids):
+        variables[f"id{i}"] = f"gid://shopify/DraftOrder/{draft_id}"
+    return query, variables, aliases
+
+def complete_draft_batch(session, shop, api_version, draft_ids, limiter=None, sizer=None, retry=None):
+    """
+    Complete several draft orders in a single GraphQL request.
+
+    Each alias's userErrors are reported against its own draft, so one failing draft
+    doesn't fail the rest of the batch.
+
+    Args:
+        session (requests.Session): Authenticated session for requests.
+        shop (str): Shopify store domain.
+        api_version (str): Shopify API version.
+        draft_ids (list): IDs of the draft orders to complete.
+        limiter (RateLimiter, optional): Rate limiter of the store.
+        sizer (BatchSizer, optional): Batch sizer to estimate the cost with and report the real cost to.
+        retry (RetryPolicy, optional): Retry policy of the store.
+
+    Returns:
+        list: (draft_id, order data or None) in the order of draft_ids.
+    """
+    results = _complete_draft_batch(session, shop, api_version, draft_ids, limiter, sizer, retry)
+
+    # Drafts that failed may have been completed by an attempt whose response was lost
+    failed = [draft_id for draft_id, order in results if order is None]
+    if failed:
+        found = find_existing_orders(session, shop, api_version, failed, limiter, retry)
+        if found:
+            print(f"{len(found)} of the failed draft orders already have an order, counting them as completed")
+            results = [(draft_id, order or found.get(draft_id)) for draft_id, order in results]
+    return results
+
+def _complete_draft_batch(session, shop, api_version, draft_ids, limiter, sizer, retry):
+    if len(draft_ids) == 1:
+        return [(draft_ids[0], complete_draft_order(session, shop, api_version, draft_ids[0], limiter, retry))]
+    query, variables, aliases = build_batch_mutation(draft_ids)
+    payload = {'query': query, 'variables': variables}
+    cost = sizer.cost(len(draft_ids)) if sizer else DEFAULT_MUTATION_COST * len(draft_ids)
+    try:
+        result = post_graphql(session, shop, api_version, payload, limiter, cost, retry)
+    except Exception as e:
+        print(f"Network error completing drafts {draft_ids[0]}..{draft_ids[-1]}: {e}")
+        return [(draft_id, None) for draft_id in draft_ids]
+    if sizer:
+        sizer.observe(len(draft_ids), (result.get("extensions") or {}).get("cost"))
+
+    data = result.get("data") or {}
+    if result.get("errors") and not data:
+        print(f"GraphQL errors completing drafts {draft_ids[0]}..{draft_ids[-1]}: {result['errors']}")
+        return [(draft_id, None) for draft_id in draft_ids]
+
+    # Map every alias back to its draft
+    results = []
+    for draft_id, alias in zip(draft_ids, aliases):
+        payload = data.get(alias) or {}
+        user_errors = payload.get("userErrors")
+        order = (payload.get("draftOrder") or {}).get("order")
+        if user_errors or not order:
+            print(f"GraphQL errors completing draft order {draft_id}: {user_errors or result.get('errors')}")
+            order = None
+        results.append((draft_id, order))
+    return results
+
+def submit_draft_batches(executor, session, shop, api_version, draft_ids, limiter, sizer=None, retry=None):
+    """
+    Split draft orders into batches and queue them on the executor without waiting for them.
+
+    Args:
+        executor (ThreadPoolExecutor): Pool the mutations run on.
+        session (requests.Session): Authenticated session for requests.
+        shop (str): Shopify store domain.
+        api_version (str): Shopify API version.
+        draft_ids (list): IDs of the draft orders to complete.
+        limiter (RateLimiter): Rate limiter of the store.
+        sizer (BatchSizer, optional): Batch sizer of the store. None sends one mutation per request.
+        retry (RetryPolicy, optional): Retry policy of the store.
+
+    Returns:
+        list: Futures of complete_draft_batch, in the order of draft_ids.
+    """
+    futures = []
+    start = 0
+    while start < len(draft_ids):
+        size = sizer.size() if sizer else 1
+        batch = draft_ids[start:start + size]
+        futures.append(executor.submit(complete_draft_batch, session, shop, api_version, batch, limiter, sizer, retry))
+        start += size
+    return futures
+
+def collect_draft_batches(futures):
+    """
+    Wait for batches queued by submit_draft_batches.
+
+    Returns:
+        list: (draft_id, order data or None) in submission order.
+    """
+    return [result for future in futures for result in future.result()]
+
+def complete_drafts_concurrently(executor, session, shop, api_version, draft_ids, limiter, sizer=None, retry=None):
+    """
+    Complete several draft orders with multiple batched mutations in flight at once.
+
+    The drafts are split into batches sized by the sizer. Concurrency is bounded by
+    the executor's worker count, pacing comes from the limiter.
+
+    Args:
+        executor (ThreadPoolExecutor): Pool the mutations run on.
+        session (requests.Session): Authenticated session for requests.
+        shop (str): Shopify store domain.
+        api_version (str): Shopify API version.
+        draft_ids (list): IDs of the draft orders to complete.
+        limiter (RateLimiter): Rate limiter of the store.
+        sizer (BatchSizer, optional): Batch sizer of the store. None sends one mutation per request.
+        retry (RetryPolicy, optional): Retry policy of the store.
+
+    Returns:
+        list: (draft_id, order data or None) in the order of draft_ids.
+    """
+    return collect_draft_batches(submit_draft_batches(executor, session, shop, api_version, draft_ids,
+                                                      limiter, sizer, retry))
+
+def process_drafts(shop, api_token, api_version, journal=None, retry=None, draft_filter=None, dry_run=False):
     """
     Main workflow for processing draft orders in a Shopify store:
       1. Fetch all open draft orders (with pagination)
@@ -173,59 +1695,234 @@ def process_drafts(shop, api_token, api_version):
         shop (str): Shopify store domain.
         api_token (str): Admin API token.
         api_version (str): Shopify API version.
+        journal (CompletionJournal, optional): Journal to resume from and record progress in.
+        retry (RetryPolicy, optional): Retry policy whose stats go into the report.
+        draft_filter (DraftFilter, optional): Filter rules, built from the configuration if None.
+        dry_run (bool): Only list the drafts that would be completed, don't send any mutation.
+
+    Returns:
+        dict: Report for this store (shop, open, completed, skipped, filtered, seconds, throttle_wait,
+            retries, requests and connections opened for them, and would_complete in a dry run).
+
+    Raises:
+        Exception: Whatever stopped the listing, with the report of the drafts handled until then
+            (and its error) as its report attribute.
     """
-    global total_open_drafts, total_completed
-    next_page = None        # Next page token for pagination
+    started = time.monotonic()
     count = 0               # Number of drafts completed in this store
     total_count = 0         # Total drafts found in this store
+    skipped = 0             # Drafts a previous run already completed
+    would_complete = 0      # Drafts a dry run would have completed
 
-    # Set up reusable session for all requests to this store
-    session = requests.Session()
-    # Use certifi bundle for SSL verification if enabled
-    if SSL_VERIFY:
-        session.verify = certifi.where()
+    # Pick up where an interrupted run stopped
+    done_ids, page_info = journal.resume(shop, LISTING_BACKEND) if journal else (set(), None)
+    if done_ids or page_info:
+        print(f"[{shop}] Resuming: {len(done_ids)} drafts already completed, "
+              f"continuing from {'cursor ' + page_info if page_info else 'the first page'}")
+
+    # Set up reusable session for all requests to this store, its pool sized to the concurrency
+    session = make_session(api_token)
+
+    # Pace requests from Shopify's own rate limit reports and size batches from the reported query cost
+    limiter = RateLimiter(shop=shop)
+    sizer = BatchSizer(limiter)
+    # Retry transient errors instead of giving up on the first one
+    retry = retry or RetryPolicy(shop=shop)
+    # Leave alone the drafts the filter rules exclude
+    draft_filter = draft_filter or DraftFilter.from_config()
+
+    def record(page):
+        # Wait for a page's batches, journal the outcomes and then the page's cursor
+        futures, next_cursor = page
+        results = collect_draft_batches(futures)
+        completed = 0
+        for draft_id, order in results:
+            if order is not None:
+                print(f"[{shop}] Completed draft order #{draft_id}")
+                completed += 1
+        add_to_totals(completed=completed)
+        metrics.add_drafts(shop, "completed", completed)
+        metrics.add_drafts(shop, "failed", len(results) - completed)
+        if journal:
+            journal.record_drafts(shop, results)
+            if next_cursor:
+                journal.commit_cursor(shop, LISTING_BACKEND, next_cursor)
+        return completed
+
+    # Stream all open draft orders: a fetcher thread pages ahead through the cursors while
+    # the pool completes the current page. The previous page is collected only after the
+    # next one is queued, so the workers stay busy across page boundaries.
+    error = None
+    with ThreadPoolExecutor(max_workers=MAX_IN_FLIGHT) as executor:
+        pending = None
+        list_pages = LISTING_BACKENDS[LISTING_BACKEND]
+        try:
+            for drafts, next_cursor in prefetch(list_pages(session, shop, api_version, limiter, page_info,
+                                                           retry, draft_filter)):
+                add_to_totals(open_drafts=len(drafts))
+                total_count += len(drafts)
+
+                # Complete the draft orders of this page that pass the filter and aren't done yet
+                selected = [d for d in draft_filter.select(drafts) if d["id"] not in done_ids]
+                skipped += sum(1 for d in drafts if d["id"] in done_ids)
+                metrics.add_drafts(shop, "listed", len(drafts))
+                if dry_run:
+                    for d in selected:
+                        print(f"[{shop}] Would complete draft order #{d['id']} {d.get('name') or ''}".rstrip())
+                    would_complete += len(selected)
+                    metrics.add_drafts(shop, "would_complete", len(selected))
+                    continue
+                draft_ids = [d["id"] for d in selected]
+                futures = submit_draft_batches(executor, session, shop, api_version, draft_ids, limiter, sizer, retry)
+                previous, pending = pending, (futures, next_cursor)
+                if previous:
+                    count += record(previous)
+        except Exception as e:
+            # Still count and report what this store got done before it failed
+            error = e
+        finally:
+            # Journal the drafts already sent even if listing failed, so a restart doesn't resend them
+            if pending:
+                count += record(pending)
+    requests_sent, connections_opened = connection_stats(session)
+    session.close()
+    if journal and not dry_run and error is None:
+        journal.finish(shop)
+    if dry_run:
+        print(f"********Dry run: would complete {would_complete} out of {total_count} open draft orders in {shop}.********")
     else:
-        session.verify = False
-        print("SSL verification is disabled")
-    # Set up headers for API requests
-    session.headers.update({
-        "X-Shopify-Access-Token": api_token,
-        "Content-Type": "application/json",
-        "Accept": "application/json"
-    })
+        print(f"********Completed {count} out of {total_count} open draft orders in {shop}. "
+              f"(workers waited {limiter.throttle_wait:.1f}s in total on rate limits)********")
+    filtered = sum(draft_filter.stats.values())
+    metrics.add_drafts(shop, "filtered", filtered)
+    metrics.add_drafts(shop, "skipped", skipped)
+    if filtered:
+        print(f"[{shop}] Filtered out {filtered} draft orders: "
+              + ", ".join(f"{reason}={n}" for reason, n in sorted(draft_filter.stats.items())))
+    report = {"shop": shop, "open": total_count, "completed": count, "skipped": skipped, "filtered": filtered,
+              "seconds": time.monotonic() - started, "throttle_wait": limiter.throttle_wait,
+              "retries": dict(retry.stats), "requests": requests_sent, "connections": connections_opened}
+    if dry_run:
+        report["would_complete"] = would_complete
+    if error is not None:
+        report["error"] = repr(error)
+        error.report = report
+        raise error
+    return report
 
-    # Loop through all open draft orders (handle pagination)
-    while True:
-        drafts, next_page = fetch_open_draft_orders(session, shop, api_version, next_page)
-        if not drafts:
-            # No more drafts to process
-            break
-
-        for d in drafts:
-            total_open_drafts += 1
-            total_count += 1
-            draft_id = d["id"]
-
-            # Complete draft order (could add tag filtering here if needed)
-            print(f"Completing draft order #{draft_id}...", end="")
-            order = complete_draft_order(session, shop, api_version, draft_id)
-            print("Completed draft order")
-            total_completed += 1
-            count += 1
-            # Sleep to avoid hitting Shopify API rate limits
-            time.sleep(0.5)
-
-        # If there's no next page, exit loop
-        if not next_page:
-            break
-    print(f"********Completed {count} out of {total_count} open draft orders in {shop}.********")
+def _process_shop(shop, api_token, api_version, journal=None, dry_run=False):
+    # Run one store and turn a failure into a report, so one store can't take the others down
+    print(f"********Fetching open draft orders in {shop}...********")
+    started = time.monotonic()
+    retry = RetryPolicy(shop=shop)
+    try:
+        report = process_drafts(shop, api_token, api_version, journal, retry, dry_run=dry_run)
+    except Exception as e:
+        print(f"********Processing {shop} failed: {e!r}********")
+        # Keep the counts of a store that failed partway, they are part of the global totals
+        report = getattr(e, "report", None)
+        if report is None:
+            report = {"shop": shop, "open": 0, "completed": 0, "skipped": 0, "filtered": 0,
+                      "seconds": time.monotonic() - started, "throttle_wait": 0.0, "retries": dict(retry.stats),
+                      "requests": 0, "connections": 0, "error": repr(e)}
+    log_event("shop_report", **report)
+    return report
+
+def process_all_shops(shops, api_tokens, api_versions, parallel=PARALLEL_SHOPS, journal=None, dry_run=False):
+    """
+    Process the draft orders of several stores, either one after another or all at once.
+
+    Each store gets its own session and rate limiter either way, so running them in
+    parallel doesn't make them compete for a rate limit bucket.
+
+    Args:
+        shops (list): Shopify store domains.
+        api_tokens (list): Admin API token of each store.
+        api_versions (list): Shopify API version of each store.
+        parallel (bool): Process the stores concurrently.
+        journal (CompletionJournal, optional): Journal to resume from and record progress in.
+        dry_run (bool): Only list the drafts that would be completed, don't send any mutation.
+
+    Returns:
+        list: Report dict of each store, in the order of shops.
+    """
+    jobs = list(zip(shops, api_tokens, api_versions))
+    if not parallel or len(jobs) < 2:
+        return [_process_shop(*job, journal, dry_run) for job in jobs]
+    with ThreadPoolExecutor(max_workers=len(jobs)) as executor:
+        return list(executor.map(lambda job: _process_shop(*job, journal, dry_run), jobs))
+
+def print_report(reports, wall_time):
+    """
+    Print the merged per-store and overall summary.
+
+    Args:
+        reports (list): Report dicts returned by process_all_shops.
+        wall_time (float): Seconds the whole run took.
+    """
+    print("********Summary********")
+    print(f"{'Store':<40}{'Open':>8}{'Completed':>11}{'Skipped':>9}{'Filtered':>10}{'Retries':>9}"
+          f"{'Time (s)':>10}{'Drafts/s':>10}")
+    all_retries = Counter()
+    for r in reports:
+        rate = r["completed"] / r["seconds"] if r["seconds"] else 0.0
+        retries = sum(n for reason, n in r["retries"].items() if reason != "gave_up")
+        all_retries.update(r["retries"])
+        line = (f"{r['shop']:<40}{r['open']:>8}{r['completed']:>11}{r['skipped']:>9}{r['filtered']:>10}{retries:>9}"
+                f"{r['seconds']:>10.1f}{rate:>10.1f}")
+        if r.get("error"):
+            line += f"  FAILED: {r['error']}"
+        print(line)
+    rate = total_completed / wall_time if wall_time else 0.0
+    skipped = sum(r["skipped"] for r in reports)
+    filtered = sum(r["filtered"] for r in reports)
+    retries = sum(n for reason, n in all_retries.items() if reason != "gave_up")
+    print(f"{'All stores':<40}{total_open_drafts:>8}{total_completed:>11}{skipped:>9}{filtered:>10}{retries:>9}"
+          f"{wall_time:>10.1f}{rate:>10.1f}")
+    if filtered:
+        print(f"Mutations avoided by filtering: {filtered}")
+    would_complete = [r["would_complete"] for r in reports if "would_complete" in r]
+    if would_complete:
+        print(f"Dry run: {sum(would_complete)} draft orders would be completed, no mutations were sent")
+    if all_retries:
+        print("Retries by reason: " + ", ".join(f"{reason}={n}" for reason, n in sorted(all_retries.items())))
+    sent = sum(r.get("requests", 0) for r in reports)
+    if sent:
+        opened = sum(r.get("connections", 0) for r in reports)
+        print(f"Connections: opened {opened} for {sent} requests ({1 - opened / sent:.0%} reused)")
 
 # ---------------------- Main Script Entry Point ----------------------
 
+def parse_args(argv=None):
+    parser = argparse.ArgumentParser(description="Complete the open draft orders of the configured Shopify stores.")
+    parser.add_argument("--dry-run", action="store_true",
+                        help="list the draft orders that would be completed without sending any mutation")
+    return parser.parse_args(argv)
+
 if __name__ == "__main__":
-    # Loop through all configured stores and process their draft orders
-    for shop, api_token, api_version in zip(SHOPS, API_TOKENS, API_VERSIONS):
-        print(f"********Fetching open draft orders in {shop}...********")
-        process_drafts(shop, api_token, api_version)
+    args = parse_args()
+
+    # Process all configured stores (concurrently if PARALLEL_SHOPS) and report on them.
+    # A dry run neither resumes from nor writes to the journal.
+    started = time.monotonic()
+    journal = CompletionJournal(JOURNAL_PATH) if JOURNAL_PATH and not args.dry_run else None
+    # Structured log and live metrics endpoint, both off unless configured
+    event_log = JsonLog(LOG_PATH) if LOG_PATH else None
+    metrics_server = serve_metrics(METRICS_PORT) if METRICS_PORT else None
+    if metrics_server:
+        print(f"Serving metrics on http://127.0.0.1:{metrics_server.server_address[1]}/metrics")
+    try:
+        reports = process_all_shops(SHOPS, API_TOKENS, API_VERSIONS, journal=journal, dry_run=args.dry_run)
+    finally:
+        if journal:
+            journal.close()
+        if METRICS_PATH:
+            write_metrics(METRICS_PATH)
+        if metrics_server:
+            metrics_server.shutdown()
+        if event_log:
+            event_log.close()
 
-    print(f"********Completed {total_completed} out of {total_open_drafts} open draft orders from both stores.********")
\ No newline at end of file
+    print_report(reports, time.monotonic() - started)
+    if not args.dry_run:
+        print(f"********Completed {total_completed} out of {total_open_drafts} open draft orders from all stores.********")
\ No newline at end of file
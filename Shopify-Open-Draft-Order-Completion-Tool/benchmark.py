@@ -0,0 +1,162 @@
+"""
+Throughput benchmark for OpenDraftOrderCompletionTool.py against the local mock store.
+
+Every completion strategy runs against a fresh mock store with the same drafts,
+latency and fault settings, and reports drafts/sec, request latency percentiles
+and the error rate. No real store is touched.
+
+    python benchmark.py --drafts 300 --latency 0.05 --error-rate 0.01
+"""
+
+import argparse
+import contextlib
+import io
+import threading
+import time
+
+import requests
+
+import mock_shopify_server as mock
+import OpenDraftOrderCompletionTool as tool
+
+# ---------------------- Strategies ----------------------
+# Settings of the tool each strategy runs with. "sequential" is the original one
+# mutation at a time (without its fixed 0.5s sleep between drafts).
+STRATEGIES = {
+    "sequential": {"MAX_IN_FLIGHT": 1, "MAX_BATCH_SIZE": 1, "PREFETCH_PAGES": 1, "LISTING_BACKEND": "rest"},
+    "concurrent": {"MAX_IN_FLIGHT": 4, "MAX_BATCH_SIZE": 1, "PREFETCH_PAGES": 2, "LISTING_BACKEND": "rest"},
+    "batched": {"MAX_IN_FLIGHT": 4, "MAX_BATCH_SIZE": 25, "PREFETCH_PAGES": 2, "LISTING_BACKEND": "rest"},
+    "bulk": {"MAX_IN_FLIGHT": 4, "MAX_BATCH_SIZE": 25, "PREFETCH_PAGES": 2, "LISTING_BACKEND": "bulk"},
+}
+
+# ---------------------- Request Recording ----------------------
+
+class RequestRecorder:
+    """
+    Records the duration and outcome of every HTTP request made through requests while active.
+    """
+
+    def __init__(self):
+        self.lock = threading.Lock()
+        self.samples = []       # (kind, seconds, ok)
+        self._original = None
+
+    def __enter__(self):
+        self._original = original = requests.Session.request
+        recorder = self
+
+        def request(session, method, url, *args, **kwargs):
+            kind = "mutation" if url.endswith("graphql.json") else "listing"
+            started = time.perf_counter()
+            ok = False
+            try:
+                resp = original(session, method, url, *args, **kwargs)
+                ok = resp.status_code < 400
+                return resp
+            finally:
+                with recorder.lock:
+                    recorder.samples.append((kind, time.perf_counter() - started, ok))
+
+        requests.Session.request = request
+        return self
+
+    def __exit__(self, *exc):
+        requests.Session.request = self._original
+
+    def latencies(self, kind=None):
+        return sorted(seconds for k, seconds, _ in self.samples if kind is None or k == kind)
+
+    def error_rate(self):
+        if not self.samples:
+            return 0.0
+        return sum(1 for _, _, ok in self.samples if not ok) / len(self.samples)
+
+def percentile(values, q):
+    """
+    Args:
+        values (list): Sorted values.
+        q (float): Percentile between 0 and 100.
+
+    Returns:
+        float: Nearest-rank percentile, 0.0 for no values.
+    """
+    if not values:
+        return 0.0
+    index = min(len(values) - 1, max(0, int(round(q / 100 * len(values) + 0.5)) - 1))
+    return values[index]
+
+# ---------------------- Benchmark ----------------------
+
+def run_strategy(name, settings, args):
+    """
+    Complete all drafts of a fresh mock store with one strategy.
+
+    Returns:
+        dict: Measurements of the run.
+    """
+    server = mock.start_mock_server(
+        drafts=args.drafts, latency=args.latency, bulk_delay=args.bulk_delay, jitter=args.jitter,
+        error_rate=args.error_rate, throttle_rate=args.throttle_rate, lost_rate=args.lost_rate,
+        graphql_max=args.bucket, restore_rate=args.restore_rate, retry_after=args.retry_after, seed=args.seed)
+    for key, value in settings.items():
+        setattr(tool, key, value)
+    tool.total_open_drafts = tool.total_completed = 0
+    try:
+        with RequestRecorder() as recorder, contextlib.redirect_stdout(io.StringIO()):
+            started = time.perf_counter()
+            # Complete every draft: no filter rules, no journal
+            report = tool.process_drafts(server.address, "benchmark-token", "2025-04",
+                                         draft_filter=tool.DraftFilter())
+            seconds = time.perf_counter() - started
+    finally:
+        server.shutdown()
+        server.server_close()
+    mutations = recorder.latencies("mutation")
+    return {"strategy": name, "seconds": seconds, "completed": report["completed"], "open": report["open"],
+            "drafts_per_sec": report["completed"] / seconds if seconds else 0.0,
+            "requests": len(recorder.samples), "p50": percentile(mutations, 50), "p95": percentile(mutations, 95),
+            "error_rate": recorder.error_rate(), "retries": sum(report["retries"].values()),
+            "connections": report["connections"]}
+
+def print_results(results):
+    print(f"{'Strategy':<12}{'Drafts/s':>10}{'Completed':>11}{'Requests':>10}{'p50 (ms)':>10}{'p95 (ms)':>10}"
+          f"{'Errors':>8}{'Retries':>9}{'Conns':>7}{'Time (s)':>10}")
+    for r in results:
+        print(f"{r['strategy']:<12}{r['drafts_per_sec']:>10.1f}{r['completed']:>6}/{r['open']:<4}{r['requests']:>10}"
+              f"{r['p50'] * 1000:>10.0f}{r['p95'] * 1000:>10.0f}{r['error_rate']:>8.1%}{r['retries']:>9}"
+              f"{r['connections']:>7}{r['seconds']:>10.1f}")
+
+def parse_args(argv=None):
+    parser = argparse.ArgumentParser(description="Benchmark the draft order completion strategies against a mock store.")
+    parser.add_argument("strategies", nargs="*", metavar="strategy",
+                        help=f"strategies to run, any of {', '.join(STRATEGIES)} (default: all)")
+    parser.add_argument("--drafts", type=int, default=300, help="open draft orders in the mock store")
+    parser.add_argument("--per-page", type=int, default=50, help="draft orders per listing page")
+    parser.add_argument("--latency", type=float, default=0.05, help="seconds every request takes")
+    parser.add_argument("--jitter", type=float, default=0.02, help="up to this many extra seconds of latency")
+    parser.add_argument("--bulk-delay", type=float, default=0.5, help="seconds a bulk operation runs")
+    parser.add_argument("--error-rate", type=float, default=0.01, help="share of requests answered with a 503")
+    parser.add_argument("--throttle-rate", type=float, default=0.01, help="share of requests answered with a 429")
+    parser.add_argument("--lost-rate", type=float, default=0.0,
+                        help="share of requests processed but answered with a 502")
+    parser.add_argument("--retry-after", type=float, default=0.2, help="Retry-After seconds sent with a 429")
+    parser.add_argument("--bucket", type=float, default=2000.0, help="GraphQL cost bucket size")
+    parser.add_argument("--restore-rate", type=float, default=100.0, help="GraphQL cost points restored per second")
+    parser.add_argument("--seed", type=int, default=0)
+    args = parser.parse_args(argv)
+    unknown = set(args.strategies) - set(STRATEGIES)
+    if unknown:
+        parser.error(f"unknown strategy(s): {', '.join(sorted(unknown))}")
+    return args
+
+if __name__ == "__main__":
+    args = parse_args()
+    tool.SHOPIFY_SCHEME = "http"
+    tool.PER_PAGE = args.per_page
+    tool.BULK_POLL_INTERVAL = 0.1
+    results = []
+    for name in args.strategies or STRATEGIES:
+        print(f"Running {name}...", flush=True)
+        results.append(run_strategy(name, STRATEGIES[name], args))
+    print()
+    print_results(results)
@@ -0,0 +1,528 @@
+"""
+Local mock of the parts of the Shopify Admin API used by OpenDraftOrderCompletionTool.py.
+
+It serves open draft orders over REST (with Link header pagination and the
+X-Shopify-Shop-Api-Call-Limit leaky bucket) and completes them through GraphQL
+draftOrderComplete mutations (with a query cost bucket reported in
+extensions.cost.throttleStatus), so the completion engine can be exercised
+without a real store. Open drafts can also be exported through a
+bulkOperationRunQuery, whose JSONL result is streamed from /bulk/<id>.jsonl.
+
+Latency (with jitter) and faults can be simulated: injected 503s, random 429s
+and "lost" responses, where the request is processed but answered with a 502.
+
+Run it standalone:
+    python mock_shopify_server.py --drafts 1000 --port 8765
+
+and point the tool at it with SHOPIFY_SCHEME=http and SHOPS = ["127.0.0.1:8765"].
+"""
+
+import argparse
+import json
+import random
+import re
+import threading
+import time
+from datetime import datetime, timedelta, timezone
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from urllib.parse import parse_qs, urlencode, urlparse
+
+# ---------------------- Configuration Section ----------------------
+# GraphQL cost bucket (Shopify standard plan values)
+GRAPHQL_MAX_AVAILABLE = 1000.0
+GRAPHQL_RESTORE_RATE = 50.0
+
+# Query cost of one draftOrderComplete mutation
+MUTATION_COST = 10
+
+# Seconds a throttled client is told to wait in Retry-After
+RETRY_AFTER = 1.0
+
+# REST leaky bucket (calls, calls leaked per second)
+REST_BUCKET_SIZE = 40
+REST_LEAK_RATE = 2.0
+
+# Seconds a bulk operation stays RUNNING before its export is ready
+BULK_DELAY = 1.0
+
+# Matches the terms of a draftOrders search: "-tag:x", "tag:\"x\"", "customer_id:1", "created_at:<=..."
+SEARCH_TERM_PATTERN = re.compile(r'(-?)(tag|customer_id|created_at|status):(<=|>=)?("(?:[^"\\]|\\.)*"|[^\s()]+)')
+
+# Matches "draftOrderComplete(id: $var" with an optional "alias:" in front
+MUTATION_PATTERN = re.compile(r"(?:(\w+)\s*:\s*)?draftOrderComplete\s*\(\s*id\s*:\s*\$(\w+)")
+
+# ---------------------- Mock Store ----------------------
+
+def make_draft(i, count, now=None):
+    """
+    Build a mock draft order. Every 10th has the "shipping_charge" tag, every 7th "wholesale",
+    every 13th has no customer, and they were created one hour apart up to now.
+    """
+    now = now or datetime.now(timezone.utc)
+    tags = [tag for tag, every in (("shipping_charge", 10), ("wholesale", 7)) if i % every == 0]
+    created = now - timedelta(hours=count - i)
+    return {"id": i, "name": f"#D{i}", "status": "open", "tags": ", ".join(tags),
+            "customer": None if i % 13 == 0 else {"id": i % 50 + 1},
+            "created_at": created.strftime("%Y-%m-%dT%H:%M:%SZ")}
+
+def matches_search(draft, search):
+    """
+    Check a draft against the subset of Shopify search syntax the tool generates:
+    status, [-]tag, customer_id and created_at:<=/>= terms; terms inside one "( ... OR ... )"
+    group match if any of them does.
+    """
+    def term_matches(negate, field, op, value):
+        value = json.loads(value) if value.startswith('"') else value
+        if field == "status":
+            ok = draft["status"] == value
+        elif field == "tag":
+            ok = value.lower() in {t.strip().lower() for t in draft["tags"].split(",") if t.strip()}
+        elif field == "customer_id":
+            ok = (draft["customer"] or {}).get("id") == int(value)
+        else:
+            ok = draft["created_at"] <= value if op == "<=" else draft["created_at"] >= value
+        return ok != bool(negate)
+
+    for group in re.findall(r"\([^)]*\)|[^\s()]+(?:\"[^\"]*\")?", search):
+        terms = SEARCH_TERM_PATTERN.findall(group)
+        if terms and not any(term_matches(*t) for t in terms):
+            return False
+    return True
+
+class MockShop:
+    """
+    State of one mock store: its draft orders and both rate limit buckets.
+
+    Args:
+        drafts (int): Number of open draft orders to create.
+        latency (float): Seconds every request takes before it is answered.
+        bulk_delay (float): Seconds a bulk operation runs before its export is ready.
+        jitter (float): Up to this many extra seconds of random latency per request.
+        error_rate (float): Share of requests answered with a 503 without being processed.
+        throttle_rate (float): Share of requests answered with a 429 on top of the real buckets.
+        lost_rate (float): Share of requests that are processed but answered with a 502.
+        graphql_max (float): Size of the GraphQL cost bucket.
+        restore_rate (float): Points the GraphQL cost bucket regains per second.
+        retry_after (float): Seconds sent in Retry-After with a 429.
+        seed (int, optional): Seed for the fault and jitter randomness.
+    """
+
+    def __init__(self, drafts=1000, latency=0.0, bulk_delay=BULK_DELAY, jitter=0.0, error_rate=0.0,
+                 throttle_rate=0.0, lost_rate=0.0, graphql_max=GRAPHQL_MAX_AVAILABLE,
+                 restore_rate=GRAPHQL_RESTORE_RATE, retry_after=RETRY_AFTER, seed=None):
+        self.lock = threading.Lock()
+        self.latency = latency
+        self.bulk_delay = bulk_delay
+        self.jitter = jitter
+        self.error_rate = error_rate
+        self.throttle_rate = throttle_rate
+        self.lost_rate = lost_rate
+        self.graphql_max = graphql_max
+        self.restore_rate = restore_rate
+        self.retry_after = retry_after
+        self.random = random.Random(seed)
+        self.drafts = {i: make_draft(i, drafts) for i in range(1, drafts + 1)}
+        self.next_order_id = 1
+        # Bulk operations: id -> (ready at, snapshot of open draft ids)
+        self.bulk_operations = {}
+        self.current_bulk = None
+        # GraphQL cost bucket
+        self.graphql_available = graphql_max
+        self.graphql_updated = time.monotonic()
+        # REST leaky bucket
+        self.rest_used = 0.0
+        self.rest_updated = time.monotonic()
+        # Request statistics
+        self.stats = {"rest_requests": 0, "graphql_requests": 0, "completed": 0,
+                      "throttled": 0, "injected_errors": 0, "injected_throttles": 0, "lost_responses": 0,
+                      "in_flight": 0, "max_in_flight": 0, "connections": 0}
+
+    def _refill(self):
+        now = time.monotonic()
+        self.graphql_available = min(self.graphql_max,
+                                     self.graphql_available + (now - self.graphql_updated) * self.restore_rate)
+        self.graphql_updated = now
+        self.rest_used = max(0.0, self.rest_used - (now - self.rest_updated) * REST_LEAK_RATE)
+        self.rest_updated = now
+
+    def throttle_status(self):
+        return {"maximumAvailable": self.graphql_max,
+                "currentlyAvailable": int(self.graphql_available),
+                "restoreRate": self.restore_rate}
+
+    def delay(self):
+        """
+        Returns:
+            float: Seconds the next request takes, latency plus random jitter.
+        """
+        with self.lock:
+            return self.latency + (self.random.uniform(0, self.jitter) if self.jitter else 0.0)
+
+    def fault(self):
+        """
+        Draw the simulated fault of a request.
+
+        Returns:
+            str or None: "error", "throttle", "lost" or None for a normal answer.
+        """
+        with self.lock:
+            r = self.random.random()
+            for name, rate, stat in (("error", self.error_rate, "injected_errors"),
+                                     ("throttle", self.throttle_rate, "injected_throttles"),
+                                     ("lost", self.lost_rate, "lost_responses")):
+                if r < rate:
+                    self.stats[stat] += 1
+                    return name
+                r -= rate
+        return None
+
+    def list_open(self, limit, page_info=None, fields=None):
+        """
+        Return one page of open drafts after the cursor, and the cursor of the next page.
+        """
+        after = int(bytes.fromhex(page_info).decode()) if page_info else 0
+        with self.lock:
+            ids = sorted(i for i, d in self.drafts.items() if d["status"] == "open" and i > after)
+            page = [dict(self.drafts[i]) for i in ids[:limit]]
+        if fields:
+            page = [{k: v for k, v in d.items() if k in fields} for d in page]
+        next_info = None
+        if len(ids) > limit:
+            next_info = str(ids[limit - 1]).encode().hex()
+        return page, next_info
+
+    def rest_call(self):
+        """
+        Count a REST call against the leaky bucket.
+
+        Returns:
+            tuple: (allowed, value for the X-Shopify-Shop-Api-Call-Limit header)
+        """
+        with self.lock:
+            self._refill()
+            self.stats["rest_requests"] += 1
+            if self.rest_used + 1 > REST_BUCKET_SIZE:
+                self.stats["throttled"] += 1
+                return False, f"{int(self.rest_used)}/{REST_BUCKET_SIZE}"
+            self.rest_used += 1
+            return True, f"{int(round(self.rest_used))}/{REST_BUCKET_SIZE}"
+
+    def complete(self, gid):
+        """
+        Complete one draft order.
+
+        Returns:
+            dict: draftOrderComplete payload.
+        """
+        draft_id = int(str(gid).rsplit("/", 1)[-1])
+        with self.lock:
+            draft = self.drafts.get(draft_id)
+            if draft is None:
+                return {"draftOrder": None, "userErrors": [{"field": ["id"], "message": "Draft order not found"}]}
+            if draft["status"] != "open":
+                return {"draftOrder": None, "userErrors": [{"field": ["id"], "message": "Draft order has already been completed"}]}
+            draft["status"] = "completed"
+            order_id = self.next_order_id
+            draft["order_id"] = order_id
+            self.next_order_id += 1
+            self.stats["completed"] += 1
+        return {"draftOrder": {"id": gid, "order": {"id": f"gid://shopify/Order/{order_id}"}}, "userErrors": []}
+
+    def start_bulk(self, bulk_query=""):
+        """
+        Start a bulk export of the currently open drafts matching the draftOrders search.
+
+        Returns:
+            dict: bulkOperationRunQuery payload.
+        """
+        match = re.search(r'draftOrders\(query:\s*("(?:[^"\\]|\\.)*")', bulk_query)
+        search = json.loads(match.group(1)) if match else "status:open"
+        with self.lock:
+            if self.current_bulk and time.monotonic() < self.bulk_operations[self.current_bulk][0]:
+                return {"bulkOperation": None, "userErrors": [
+                    {"field": None, "message": "A bulk query operation for this app and shop is already in progress."}]}
+            operation_id = f"gid://shopify/BulkOperation/{len(self.bulk_operations) + 1}"
+            ids = sorted(i for i, d in self.drafts.items() if matches_search(d, search))
+            self.bulk_operations[operation_id] = (time.monotonic() + self.bulk_delay, ids)
+            self.current_bulk = operation_id
+        return {"bulkOperation": {"id": operation_id, "status": "CREATED"}, "userErrors": []}
+
+    def bulk_status(self, host):
+        """
+        Returns:
+            dict: currentBulkOperation payload, with the export URL once it is ready.
+        """
+        with self.lock:
+            if not self.current_bulk:
+                return None
+            ready_at, ids = self.bulk_operations[self.current_bulk]
+            if time.monotonic() < ready_at:
+                return {"id": self.current_bulk, "status": "RUNNING", "errorCode": None,
+                        "objectCount": "0", "url": None}
+            number = self.current_bulk.rsplit("/", 1)[-1]
+            return {"id": self.current_bulk, "status": "COMPLETED", "errorCode": None,
+                    "objectCount": str(len(ids)), "url": f"http://{host}/bulk/{number}.jsonl" if ids else None}
+
+    def bulk_lines(self, number):
+        """
+        Yield the JSONL lines of a finished export.
+        """
+        _, ids = self.bulk_operations[f"gid://shopify/BulkOperation/{number}"]
+        for i in ids:
+            draft = self.drafts[i]
+            tags = [t.strip() for t in draft["tags"].split(",") if t.strip()]
+            customer = {"legacyResourceId": str(draft["customer"]["id"])} if draft["customer"] else None
+            yield json.dumps({"id": f"gid://shopify/DraftOrder/{i}", "legacyResourceId": str(i),
+                              "name": draft["name"], "tags": tags, "createdAt": draft["created_at"],
+                              "customer": customer}).encode() + b"\n"
+
+    def node(self, gid):
+        """
+        Returns:
+            dict or None: DraftOrder node with its order, None if the draft doesn't exist.
+        """
+        with self.lock:
+            draft = self.drafts.get(int(str(gid).rsplit("/", 1)[-1]))
+            if draft is None:
+                return None
+            order_id = draft.get("order_id")
+        return {"id": gid, "order": {"id": f"gid://shopify/Order/{order_id}"} if order_id else None}
+
+    def graphql(self, payload, host="127.0.0.1"):
+        """
+        Execute a GraphQL document: (optionally aliased) draftOrderComplete mutations,
+        bulkOperationRunQuery, a currentBulkOperation query or a nodes query.
+
+        Returns:
+            dict: GraphQL response including extensions.cost.
+        """
+        query = payload.get("query", "")
+        variables = payload.get("variables") or {}
+        if "bulkOperationRunQuery" in query:
+            bulk_query = variables.get("query") or query
+            return self._charge(10, lambda: {"bulkOperationRunQuery": self.start_bulk(bulk_query)})
+        if "currentBulkOperation" in query:
+            return self._charge(1, lambda: {"currentBulkOperation": self.bulk_status(host)})
+        if "nodes(" in query:
+            ids = variables.get("ids") or []
+            return self._charge(1 + len(ids), lambda: {"nodes": [self.node(gid) for gid in ids]})
+        mutations = MUTATION_PATTERN.findall(query)
+
+        def run():
+            data = {}
+            for alias, var in mutations:
+                data[alias or "draftOrderComplete"] = self.complete(variables.get(var))
+            return data
+        return self._charge(MUTATION_COST * max(1, len(mutations)), run)
+
+    def _charge(self, cost, run):
+        # Draw cost from the GraphQL bucket and run the operation, or answer THROTTLED
+        with self.lock:
+            self._refill()
+            self.stats["graphql_requests"] += 1
+            if cost > self.graphql_available:
+                self.stats["throttled"] += 1
+                return {"errors": [{"message": "Throttled", "extensions": {"code": "THROTTLED"}}],
+                        "extensions": {"cost": {"requestedQueryCost": cost, "actualQueryCost": None,
+                                                "throttleStatus": self.throttle_status()}}}
+            self.graphql_available -= cost
+        data = run()
+        with self.lock:
+            status = self.throttle_status()
+        return {"data": data,
+                "extensions": {"cost": {"requestedQueryCost": cost, "actualQueryCost": cost,
+                                        "throttleStatus": status}}}
+
+# ---------------------- HTTP Server ----------------------
+
+class MockShopifyHandler(BaseHTTPRequestHandler):
+    """
+    Routes /admin/api/<version>/draft_orders.json and /admin/api/<version>/graphql.json to the MockShop.
+    """
+    # Keep connections open between requests, like Shopify does. Without Nagle's algorithm
+    # the body isn't held back until the client acknowledges the headers.
+    protocol_version = "HTTP/1.1"
+    disable_nagle_algorithm = True
+
+    def log_message(self, format, *args):
+        pass
+
+    def setup(self):
+        super().setup()
+        with self.server.shop.lock:
+            self.server.shop.stats["connections"] += 1
+
+    def _send_json(self, status, body, headers=None):
+        data = json.dumps(body).encode()
+        self.send_response(status)
+        self.send_header("Content-Type", "application/json")
+        self.send_header("Content-Length", str(len(data)))
+        for key, value in (headers or {}).items():
+            self.send_header(key, value)
+        self.end_headers()
+        self.wfile.write(data)
+
+    def _begin(self):
+        shop = self.server.shop
+        with shop.lock:
+            shop.stats["in_flight"] += 1
+            shop.stats["max_in_flight"] = max(shop.stats["max_in_flight"], shop.stats["in_flight"])
+        delay = shop.delay()
+        if delay:
+            time.sleep(delay)
+        return shop
+
+    def _send_fault(self, shop, fault):
+        # Answer an injected 503 or 429 before the request is processed
+        if fault == "error":
+            self._send_json(503, {"errors": "Service Unavailable"})
+        else:
+            self._send_json(429, {"errors": "Throttled"}, {"Retry-After": str(shop.retry_after)})
+
+    def _end(self, shop):
+        with shop.lock:
+            shop.stats["in_flight"] -= 1
+
+    def _send_bulk(self, number):
+        # Stream the export line by line with chunked encoding, like a large file download
+        shop = self.server.shop
+        if f"gid://shopify/BulkOperation/{number}" not in shop.bulk_operations:
+            self._send_json(404, {"errors": "Not Found"})
+            return
+        self.send_response(200)
+        self.send_header("Content-Type", "application/jsonl")
+        self.send_header("Transfer-Encoding", "chunked")
+        self.end_headers()
+        for line in shop.bulk_lines(number):
+            self.wfile.write(f"{len(line):X}\r\n".encode() + line + b"\r\n")
+        self.wfile.write(b"0\r\n\r\n")
+
+    def do_GET(self):
+        url = urlparse(self.path)
+        bulk = re.fullmatch(r"/bulk/(\d+)\.jsonl", url.path)
+        if bulk:
+            self._send_bulk(bulk.group(1))
+            return
+        if not url.path.endswith("/draft_orders.json"):
+            self._send_json(404, {"errors": "Not Found"})
+            return
+        shop = self._begin()
+        try:
+            fault = shop.fault()
+            if fault in ("error", "throttle"):
+                self._send_fault(shop, fault)
+                return
+            allowed, call_limit = shop.rest_call()
+            if not allowed:
+                self._send_json(429, {"errors": "Exceeded 2 calls per second for api client. Reduce request rates to resume uninterrupted service."},
+                                {"Retry-After": str(shop.retry_after), "X-Shopify-Shop-Api-Call-Limit": call_limit})
+                return
+            params = {k: v[0] for k, v in parse_qs(url.query).items()}
+            limit = min(int(params.get("limit", 50)), 250)
+            fields = set(params["fields"].split(",")) if params.get("fields") else None
+            drafts, next_info = shop.list_open(limit, params.get("page_info"), fields)
+            headers = {"X-Shopify-Shop-Api-Call-Limit": call_limit}
+            if next_info:
+                host = self.headers.get("Host", "127.0.0.1")
+                query = {"page_info": next_info, "limit": limit}
+                if params.get("fields"):
+                    query["fields"] = params["fields"]
+                query = urlencode(query)
+                headers["Link"] = f'<http://{host}{url.path}?{query}>; rel="next"'
+            if fault == "lost":
+                self._send_json(502, {"errors": "Bad Gateway"})
+                return
+            self._send_json(200, {"draft_orders": drafts}, headers)
+        finally:
+            self._end(shop)
+
+    def do_POST(self):
+        url = urlparse(self.path)
+        # Read the body even for a 404, so it isn't left on the kept-alive connection
+        length = int(self.headers.get("Content-Length", 0))
+        body = self.rfile.read(length)
+        if not url.path.endswith("/graphql.json"):
+            self._send_json(404, {"errors": "Not Found"})
+            return
+        payload = json.loads(body or b"{}")
+        shop = self._begin()
+        try:
+            fault = shop.fault()
+            if fault in ("error", "throttle"):
+                self._send_fault(shop, fault)
+                return
+            result = shop.graphql(payload, self.headers.get("Host", "127.0.0.1"))
+            if fault == "lost":
+                self._send_json(502, {"errors": "Bad Gateway"})
+                return
+            self._send_json(200, result)
+        finally:
+            self._end(shop)
+
+class MockShopifyServer(ThreadingHTTPServer):
+    """
+    Threaded HTTP server serving one MockShop.
+    """
+    daemon_threads = True
+
+    def __init__(self, shop, host="127.0.0.1", port=0):
+        super().__init__((host, port), MockShopifyHandler)
+        self.shop = shop
+
+    @property
+    def address(self):
+        """
+        str: "host:port" to use as the shop domain.
+        """
+        host, port = self.server_address[:2]
+        return f"{host}:{port}"
+
+def start_mock_server(drafts=1000, latency=0.0, host="127.0.0.1", port=0, bulk_delay=BULK_DELAY, **options):
+    """
+    Start a mock store in a background thread.
+
+    Args:
+        drafts (int): Number of open draft orders to create.
+        latency (float): Seconds every request takes before it is answered.
+        host (str): Interface to bind.
+        port (int): Port to bind, 0 picks a free one.
+        bulk_delay (float): Seconds a bulk operation runs before its export is ready.
+        **options: Further MockShop options (jitter, error_rate, throttle_rate, lost_rate, ...).
+
+    Returns:
+        MockShopifyServer: Running server, stop it with shutdown().
+    """
+    server = MockShopifyServer(MockShop(drafts, latency, bulk_delay, **options), host, port)
+    threading.Thread(target=server.serve_forever, daemon=True).start()
+    return server
+
+# ---------------------- Main Script Entry Point ----------------------
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Local mock of the Shopify Admin API draft order endpoints.")
+    parser.add_argument("--host", default="127.0.0.1")
+    parser.add_argument("--port", type=int, default=8765)
+    parser.add_argument("--drafts", type=int, default=1000, help="number of open draft orders to create")
+    parser.add_argument("--latency", type=float, default=0.0, help="seconds every request takes")
+    parser.add_argument("--jitter", type=float, default=0.0, help="up to this many extra seconds of latency")
+    parser.add_argument("--bulk-delay", type=float, default=BULK_DELAY, help="seconds a bulk operation runs")
+    parser.add_argument("--error-rate", type=float, default=0.0, help="share of requests answered with a 503")
+    parser.add_argument("--throttle-rate", type=float, default=0.0, help="share of requests answered with a 429")
+    parser.add_argument("--lost-rate", type=float, default=0.0,
+                        help="share of requests processed but answered with a 502")
+    parser.add_argument("--bucket", type=float, default=GRAPHQL_MAX_AVAILABLE, help="GraphQL cost bucket size")
+    parser.add_argument("--restore-rate", type=float, default=GRAPHQL_RESTORE_RATE,
+                        help="GraphQL cost points restored per second")
+    parser.add_argument("--seed", type=int, default=None)
+    args = parser.parse_args()
+
+    shop = MockShop(args.drafts, args.latency, args.bulk_delay, jitter=args.jitter, error_rate=args.error_rate,
+                    throttle_rate=args.throttle_rate, lost_rate=args.lost_rate, graphql_max=args.bucket,
+                    restore_rate=args.restore_rate, seed=args.seed)
+    server = MockShopifyServer(shop, args.host, args.port)
+    print(f"Mock Shopify store with {args.drafts} open draft orders on http://{server.address}")
+    try:
+        server.serve_forever()
+    except KeyboardInterrupt:
+        pass
+    print(f"Stats: {server.shop.stats}")
@@ -3,6 +3,26 @@ Dominick Jean
 
 Sudoku Solver
 """
+# The board is 81 cells row by row in a bytearray, 0 for empty cells. The 11x11 grid with
+# "" separator rows and columns at 3 and 7 only exists for input and display.
+ROW_OF = [cell // 9 for cell in range(81)]
+COL_OF = [cell % 9 for cell in range(81)]
+BOX_OF = [(cell // 27) * 3 + (cell % 9) // 3 for cell in range(81)]
+UNITS = ([[r * 9 + c for c in range(9)] for r in range(9)]
+         + [[r * 9 + c for r in range(9)] for c in range(9)]
+         + [[cell for cell in range(81) if BOX_OF[cell] == b] for b in range(9)])
+# the 20 other cells sharing a row, column or box with each cell
+PEERS = [tuple(sorted({peer for unit in UNITS if cell in unit for peer in unit} - {cell})) for cell in range(81)]
+
+# display row/column of each board row/column
+DISPLAY_SIZE = 11
+DISPLAY_INDEX = [0, 1, 2, 4, 5, 6, 8, 9, 10]
+
+
+def new_board():
+    return bytearray(81)
+
+
 def get_number():
     while True:
         num = input("Enter a number (0-9): ")
@@ -12,29 +32,12 @@ def get_number():
             print("Invalid input. Please enter a number between 0 and 9.")
 
 
-def fill_board(board_size):
-    board = []  # Initialize the empty board
-    for row in range(board_size):
-        current_row = []
-        if row == 3 or row == 7:
-            print(end="")
-        elif row >= 7:
-            print(f"Enter numbers for row {row - 1}:")
-        elif row >= 4:
-            print(f"Enter numbers for row {row}:")
-        else:
-            print(f"Enter numbers for row {row + 1}:")
-        for col in range(board_size):
-            if (row == 3 or row == 7) and (col == 3 or col == 7):
-                num = ""
-            elif row == 3 or row == 7:
-                num = ""
-            elif col == 3 or col == 7:
-                num = ""
-            else:
-                num = get_number()
-            current_row.append(num)
-        board.append(current_row)
+def fill_board():
+    board = new_board()
+    for row in range(9):
+        print(f"Enter numbers for row {row + 1}:")
+        for col in range(9):
+            board[row * 9 + col] = get_number()
     return board
 
 
@@ -43,78 +46,218 @@ def change_row(board):
         row = get_int("Please enter the row number (1-9): ", "Invalid input.")
 
         if 0 < row < 10:
-            if row > 6:
-                row += 2
-            elif row > 3:
-                row += 1
-
             break
         else:
             print("Not within the number range (1-9)")
 
-    for col in range(11):
-        if (row == 3 or row == 7) and (col == 3 or col == 7):
-            num = ""
-        elif row == 3 or row == 7:
-            num = ""
-        elif col == 3 or col == 7:
-            num = ""
-        else:
-            num = get_number()
-        board[row][col] = num
+    for col in range(9):
+        board[(row - 1) * 9 + col] = get_number()
 
 
-def move_check(board, row, col, num):
-    # check if number is not in the box
-    section_row = row - row % 4
-    section_col = col - col % 4
-    for i in range(3):
-        for j in range(3):
-            if board[i + section_row][j + section_col] == num:
-                return False
+def parse_board(text):
+    """
+    [text] 81 digits row by row, "." or "0" for empty cells (whitespace is ignored)
+    [return] board
+    """
+    chars = "".join(text.split())
+    if len(chars) != 81 or any(char not in ".0123456789" for char in chars):
+        raise ValueError("A board needs 81 digits or dots")
+    return bytearray(0 if char == "." else int(char) for char in chars)
+
+
+def display_cells(display):
+    """
+    positions of the 81 board cells on a display grid
+    [display] 11x11 display grid, or a plain 9x9 grid
+    [return] list of (row, col) grid positions in cell order
+    """
+    indices = DISPLAY_INDEX if len(display) == DISPLAY_SIZE else list(range(9))
+    return [(row, col) for row in indices for col in indices]
+
+
+def from_display(display):
+    """
+    [display] 11x11 display grid or plain 9x9 grid, 0 for empty cells
+    [return] board
+    """
+    return bytearray(display[row][col] for row, col in display_cells(display))
+
+
+def to_display(board):
+    """
+    [return] 11x11 display grid of the board, with "" separator rows and columns
+    """
+    display = [["" for _ in range(DISPLAY_SIZE)] for _ in range(DISPLAY_SIZE)]
+    for (row, col), num in zip(display_cells(display), board):
+        display[row][col] = num
+    return display
+
+
+# Print the filled board
+def print_board(board):
+    for row in to_display(board):
+        print(" ".join(str(num) if num != 0 else '.' for num in row))
 
-    # check if number is not in the row
-    for x in range(11):
-        if board[x][col] == num:
-            return False
 
-    # check if number is not in the column
-    for y in range(11):
-        if board[row][y] == num:
+def move_check(board, cell, num):
+    # check if number is not in the cell's row, column or box
+    for peer in PEERS[cell]:
+        if board[peer] == num:
             return False
 
     return True
 
 
 def find_next(board):
-    for i in range(11):
-        for j in range(11):
-            if board[i][j] == 0:
-                return (i, j)
+    cell = board.find(0)
+    return None if cell < 0 else cell
 
-    return None
 
-
-def solve(board):
-    next = find_next(board)
-    if not next:
+def backtrack_solve(board):
+    # the original solver, tries 1-9 in the first empty cell and backtracks (kept as a reference for benchmarks)
+    cell = find_next(board)
+    if cell is None:
         return True
-    row, col = next
 
     for num in range(1, 10):
-        if move_check(board, row, col, num):
-            board[row][col] = num
+        if move_check(board, cell, num):
+            board[cell] = num
 
-            if solve(board):
+            if backtrack_solve(board):
                 return True
 
             # Resets to 0 for backtracking
-            board[row][col] = 0
+            board[cell] = 0
 
     # start backtracking
     return False
 
 
+# bitmask solver engine: digit d is bit 1 << (d - 1) in the row, column and box masks
+ALL_DIGITS = 0x1FF
+BIT_COUNT = [bin(mask).count("1") for mask in range(ALL_DIGITS + 1)]
+
+
+def place(grid, masks, cell, digit, trail):
+    # put a digit into a cell and mark it used in the cell's row, column and box
+    bit = 1 << (digit - 1)
+    grid[cell] = digit
+    masks[0][ROW_OF[cell]] |= bit
+    masks[1][COL_OF[cell]] |= bit
+    masks[2][BOX_OF[cell]] |= bit
+    trail.append(cell)
+
+
+def unplace(grid, masks, trail, mark):
+    # take back the placements made since the trail was mark long
+    while len(trail) > mark:
+        cell = trail.pop()
+        bit = ~(1 << (grid[cell] - 1))
+        grid[cell] = 0
+        masks[0][ROW_OF[cell]] &= bit
+        masks[1][COL_OF[cell]] &= bit
+        masks[2][BOX_OF[cell]] &= bit
+
+
+def propagate(grid, masks, trail):
+    """
+    fill in naked singles (cells with one candidate) and hidden singles (digits with one place in a unit)
+    until neither is left
+    [return] (cell, candidates) of the empty cell with the fewest candidates, (None, 0) if the grid is full,
+             or None if a cell or unit ran out of options
+    """
+    rows, cols, boxes = masks
+    while True:
+        placed = False
+        best, best_mask, best_count = None, 0, 10
+        for cell in range(81):
+            if grid[cell]:
+                continue
+            mask = ALL_DIGITS & ~(rows[ROW_OF[cell]] | cols[COL_OF[cell]] | boxes[BOX_OF[cell]])
+            count = BIT_COUNT[mask]
+            if count == 0:
+                return None
+            if count == 1:
+                place(grid, masks, cell, mask.bit_length(), trail)
+                placed = True
+            elif count < best_count:
+                best, best_mask, best_count = cell, mask, count
+        if placed:
+            continue
+
+        for unit in UNITS:
+            once = twice = used = 0
+            for cell in unit:
+                if grid[cell]:
+                    used |= 1 << (grid[cell] - 1)
+                else:
+                    mask = ALL_DIGITS & ~(rows[ROW_OF[cell]] | cols[COL_OF[cell]] | boxes[BOX_OF[cell]])
+                    twice |= once & mask
+                    once |= mask
+            if once | used != ALL_DIGITS:
+                return None     # a digit has nowhere to go in this unit
+            unique = once & ~twice
+            if not unique:
+                continue
+            for cell in unit:
+                if grid[cell]:
+                    continue
+                mask = unique & ~(rows[ROW_OF[cell]] | cols[COL_OF[cell]] | boxes[BOX_OF[cell]])
+                if mask:
+                    if mask & (mask - 1):
+                        return None     # one cell is the only place for two digits
+                    place(grid, masks, cell, mask.bit_length(), trail)
+                    placed = True
+        if not placed:
+            return best, best_mask
+
+
+def search(grid, masks):
+    # propagate, then guess in the most constrained cell; leaves the grid as it found it on failure
+    trail = []
+    found = propagate(grid, masks, trail)
+    if found is not None:
+        cell, mask = found
+        if cell is None:
+            return True
+        while mask:
+            bit = mask & -mask
+            mask ^= bit
+            mark = len(trail)
+            place(grid, masks, cell, bit.bit_length(), trail)
+            if search(grid, masks):
+                return True
+            unplace(grid, masks, trail, mark)
+    unplace(grid, masks, trail, 0)
+    return False
+
+
+def solve(board):
+    """
+    solve a board in place with the bitmask engine
+    [board] board (bytearray of 81 cells); an 11x11 display grid or 9x9 grid is solved through a board
+    [return] True if the board was solved, False if it has no solution (the board is left unchanged)
+    """
+    if len(board) != 81:
+        grid = from_display(board)
+        if not solve(grid):
+            return False
+        for (row, col), num in zip(display_cells(board), grid):
+            board[row][col] = num
+        return True
+
+    masks = ([0] * 9, [0] * 9, [0] * 9)
+    for cell in range(81):
+        digit = board[cell]
+        if digit:
+            # two equal givens in a row, column or box can't be solved
+            if (masks[0][ROW_OF[cell]] | masks[1][COL_OF[cell]] | masks[2][BOX_OF[cell]]) & (1 << (digit - 1)):
+                return False
+            place(board, masks, cell, digit, [])
+
+    return search(board, masks)
+
+
 temp_sudoku_board = [
     [5, 3, 0, 0, 7, 0, 0, 0, 0],
     [6, 0, 0, 1, 9, 5, 0, 0, 0],
@@ -127,11 +270,6 @@ temp_sudoku_board = [
     [0, 0, 0, 0, 8, 0, 0, 7, 9]
 ]
 
-# Print the filled board
-def print_board(board):
-    for row in board:
-        print(" ".join(str(num) if num != 0 else '.' for num in row))
-
 
 def get_int(msg, errorMsg):
     while True:
@@ -148,7 +286,7 @@ def get_int(msg, errorMsg):
 def main():
     print("Welcome to the sudoku puzzle solver!")
     print("Please type in your board in the order they appear by row.")
-    sudoku_board = fill_board(11)
+    sudoku_board = fill_board()
 
     while True:
         print_board(sudoku_board)
@@ -162,8 +300,7 @@ def main():
 
         if response == 1:
             if solve(sudoku_board):
-                for row in sudoku_board:
-                    print(" ".join(str(num) if num != 0 else '.' for num in row))
+                print_board(sudoku_board)
             else:
                 print("No solution.")
         elif response == 2:
@@ -189,7 +326,7 @@ def main():
                 response = get_int("Select (1-2): ", "Invalid Input.")
 
                 if response == 1:
-                    sudoku_board = fill_board(11)
+                    sudoku_board = fill_board()
                     break
                 elif response == 2:
                     print("OK.")
@@ -202,4 +339,5 @@ def main():
             print("Please enter between 1 and 4.")
 
 
-main()
\ No newline at end of file
+if __name__ == "__main__":
+    main()
\ No newline at end of file
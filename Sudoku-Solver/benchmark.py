@@ -0,0 +1,106 @@
+"""
+Dominick Jean
+
+Sudoku Solver - benchmarks
+"""
+import argparse
+import time
+
+import SudokuSolver as solver
+
+# standard hard puzzles, row by row with "." for empty cells (all with a unique solution)
+HARD_PUZZLES = {
+    "inkala_2012": "8..........36......7..9.2...5...7.......457.....1...3...1....68..85...1..9....4..",
+    "ai_escargot": "1....7.9..3..2...8..96..5....53..9...1..8...26....4...3......1..4......7..7...3..",
+    "easter_monster": "1.......2.9.4...5...6...7...5.9.3.......7.......85..4.7.....6...3...9.8...2.....1",
+    "top95_01": "4.....8.5.3..........7......2.....6.....8.4......1.......6.3.7.5..2.....1.4......",
+    "top95_02": "52...6.........7.13...........4..8..6......5...........418.........3..2...87.....",
+    "top95_03": "6.....8.3.4.7.................5.4.7.3..2.....1.6.......2.....5.....8.6......1....",
+    "top95_04": "48.3............71.2.......7.5....6....2..8.............1.76...3.....4......5....",
+    "top95_05": "....14....3....2...7..........9...3.6.1.............8.2.....1.4....5.6.....7.8...",
+    "top95_06": "......52..8.4......3...9...5.1...6..2..7........3.....6...1..........7.4.......3.",
+    "top95_07": "6.2.5.........3.4..........43...8....1....2........7..5..27...........81...6.....",
+    "top95_08": ".524.........7.1..............8.2...3.....6...9.5.....1.6.3...........897........",
+    "top95_09": "6.2.5.........4.3..........43...8....1....2........7..5..27...........81...6.....",
+    "top95_10": ".923.........8.1...........1.7.4...........658.........6.5.2...4.....7.....9.....",
+}
+
+# puzzles the backtracking solver gets through in seconds (top95_01 and top95_02 take minutes)
+BACKTRACKING_PUZZLES = ("sample", "inkala_2012", "ai_escargot", "top95_03")
+
+
+def sample_puzzle():
+    """
+    [return] the temp_sudoku_board of SudokuSolver as a puzzle string
+    """
+    return "".join(str(num) for num in solver.from_display(solver.temp_sudoku_board))
+
+
+def check_solution(puzzle, board):
+    """
+    [return] True if the board is a full valid grid that keeps the puzzle's givens
+    """
+    if any(char not in ".0" and int(char) != num for char, num in zip(puzzle, board)):
+        return False
+    return all(sorted(board[cell] for cell in unit) == list(range(1, 10)) for unit in solver.UNITS)
+
+
+def time_solve(solve, puzzle, repeat):
+    """
+    [return] best time in seconds of solving the puzzle from scratch
+    """
+    best = float("inf")
+    for _ in range(repeat):
+        board = solver.parse_board(puzzle)
+        start = time.perf_counter()
+        solved = solve(board)
+        best = min(best, time.perf_counter() - start)
+        assert solved and check_solution(puzzle, board)
+    return best
+
+
+def bench_engine(repeat=3):
+    """
+    solve time of the bitmask engine on the hard puzzle corpus
+    [repeat] solves per puzzle, the best time is shown
+    """
+    print(f"{'puzzle':<16} {'givens':>6} {'ms':>8}")
+    total = 0.0
+    for name, puzzle in HARD_PUZZLES.items():
+        elapsed = time_solve(solver.solve, puzzle, repeat)
+        total += elapsed
+        givens = sum(char not in ".0" for char in puzzle)
+        print(f"{name:<16} {givens:>6} {elapsed * 1000:>8.1f}")
+    print(f"{'total':<16} {'':>6} {total * 1000:>8.1f}  ({len(HARD_PUZZLES) / total:.1f} puzzles/s)")
+
+
+def bench_backtracking(names=BACKTRACKING_PUZZLES):
+    """
+    compare the original backtracking solver with the bitmask engine
+    [names] puzzles to compare ("sample" is temp_sudoku_board)
+    """
+    print(f"{'puzzle':<16} {'backtrack ms':>13} {'bitmask ms':>11} {'speedup':>8}")
+    for name in names:
+        puzzle = sample_puzzle() if name == "sample" else HARD_PUZZLES[name]
+        old_t = time_solve(solver.backtrack_solve, puzzle, 1)
+        new_t = time_solve(solver.solve, puzzle, 3)
+        print(f"{name:<16} {old_t * 1000:>13.1f} {new_t * 1000:>11.1f} {old_t / new_t:>7.0f}x")
+
+
+BENCHMARKS = {
+    "engine": bench_engine,
+    "backtracking": bench_backtracking,
+}
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Sudoku Solver benchmarks")
+    parser.add_argument("benchmarks", nargs="*", metavar="name",
+                        help=f"benchmarks to run, any of {', '.join(BENCHMARKS)} (default: all)")
+    args = parser.parse_args()
+    unknown = set(args.benchmarks) - set(BENCHMARKS)
+    if unknown:
+        parser.error(f"unknown benchmark(s): {', '.join(sorted(unknown))}")
+    for name in args.benchmarks or BENCHMARKS:
+        print(f"== {name} ==")
+        BENCHMARKS[name]()
+        print()